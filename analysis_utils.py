@@ -1,7 +1,22 @@
+import asyncio
+import bisect
+import collections
+import functools
+import math
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
+from scipy.special import xlogy
+from scipy.stats import chi2, norm, qmc
 import matplotlib.pyplot as plt
 import seaborn as sns
 import plotly.graph_objects as go
@@ -9,70 +24,812 @@ from plotly.subplots import make_subplots
 import streamlit as st
 
 
+CRYPTO_SUFFIXES = ("-USD", "-USDT", "-EUR", "-GBP", "-JPY", "-USDC")
+
+
+@functools.lru_cache(maxsize=None)
+def _is_crypto_symbol(ticker):
+    return ticker.upper().endswith(CRYPTO_SUFFIXES)
+
+
 def get_annualization_factor(ticker):
     """
     Determine annualization factor based on asset type.
     Crypto trades 365 days/year, stocks trade 252 days/year.
     """
-    # Check if ticker is crypto (ends with -USD or similar patterns)
-    crypto_patterns = ["-USD", "-USDT", "-EUR", "-GBP", "-JPY", "-USDC"]
-    is_crypto = any(ticker.upper().endswith(pattern) for pattern in crypto_patterns)
-    return 365 if is_crypto else 252
+    position = security_master.position(ticker)
+    if position >= 0:
+        return int(security_master.annualization_factor[position])
+    return 365 if _is_crypto_symbol(ticker) else 252
 
 
-@st.cache_data
-def get_stock_data(ticker, period="1y"):
-    df = yf.download(ticker, period=period, auto_adjust=True)
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.droplevel(1)
-    df["Log_Return"] = np.log(df["Close"] / df["Close"].shift(1))
+# On-disk price store: one Parquet file per ticker holding the full
+# auto-adjusted OHLCV history. Every period is sliced out of it.
+PRICE_STORE_DIR = os.environ.get(
+    "ALGO_RISK_PRICE_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".price_store"),
+)
+# Stored histories younger than this are served without asking for new bars.
+PRICE_STORE_TTL = pd.Timedelta(hours=1)
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+_PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+_PERIOD_ORDER = ["1d", "5d", "1mo", "3mo", "6mo", "ytd", "1y", "2y", "5y", "10y", "max"]
+
+# Minimum window loaded into memory per ticker, so moving between pages
+# with different period selectors never reloads the same ticker.
+HISTORY_WINDOW = "10y"
+
+# Per-ticker history covering the widest period requested so far:
+# {ticker: (period, frame)}. Shorter periods are served as views of it.
+_price_cache = {}
+
+
+def _prepare_price_frame(df):
+    """
+    Cached price frame: one read-only float64 array per column plus
+    Log_Return. Cache hits hand these arrays out without copying them.
+    """
+    df = df.dropna(how="all")
+    columns = {column: np.array(df[column], dtype=float) for column in df.columns}
+    close = columns["Close"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        columns["Log_Return"] = np.log(close / np.concatenate([[np.nan], close[:-1]]))
+    for values in columns.values():
+        values.flags.writeable = False
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _split_download(raw, tickers):
+    """
+    Split a yf.download result into one OHLCV frame per ticker.
+    """
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {tickers[0]: raw} if len(tickers) == 1 else {}
+    level = 0 if set(tickers) & set(raw.columns.get_level_values(0)) else 1
+    available = set(raw.columns.get_level_values(level))
+    return {
+        ticker: raw.xs(ticker, axis=1, level=level)
+        for ticker in tickers
+        if ticker in available
+    }
+
+
+def _clean_ohlcv(frame):
+    frame = frame[[c for c in OHLCV_COLUMNS if c in frame.columns]].dropna(how="all")
+    frame.columns.name = None
+    return frame
+
+
+def _limit_history(df, period=None, start=None):
+    if start is not None:
+        return df[df.index >= pd.Timestamp(start)]
+    if period is not None:
+        return slice_period(df, period)
     return df
 
 
-def add_indicators(df):
-    df["SMA_20"] = df["Close"].rolling(20).mean()
-    df["SMA_50"] = df["Close"].rolling(50).mean()
-    df["SMA_200"] = df["Close"].rolling(200).mean()
-    delta = df["Close"].diff()
+class MarketDataProvider:
+    """
+    Source of auto-adjusted daily OHLCV history.
+
+    download() takes either a yfinance-style period or a start date and
+    returns {ticker: frame}; tickers without data are left out.
+    persistent providers are mirrored into the on-disk price store.
+    """
+
+    persistent = False
+    # Remote host shared by all requests, used for per-host rate limiting.
+    host = None
+
+    def download(self, tickers, period=None, start=None):
+        raise NotImplementedError
+
+    def history(self, ticker, period=None, start=None):
+        """
+        Single-ticker fetch that raises on transport errors instead of
+        dropping the ticker, so callers can retry. Returns None if there
+        is simply no data.
+        """
+        return self.download([ticker], period=period, start=start).get(ticker)
+
+
+_yf_download_lock = threading.Lock()
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Live Yahoo Finance data through one batched, threaded yf.download call.
+    """
+
+    persistent = True
+    host = "query2.finance.yahoo.com"
+
+    def download(self, tickers, period=None, start=None):
+        # yf.download collects results in module-level state, so concurrent
+        # calls from several threads are serialized; each call still fetches
+        # its tickers in parallel.
+        with _yf_download_lock:
+            raw = yf.download(
+                list(tickers),
+                period=period,
+                start=start,
+                auto_adjust=True,
+                group_by="ticker",
+                threads=True,
+                progress=False,
+            )
+        frames = {}
+        for ticker, frame in _split_download(raw, list(tickers)).items():
+            frame = _clean_ohlcv(frame)
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+    def history(self, ticker, period=None, start=None):
+        # Ticker.history keeps no shared state, so it needs no lock.
+        frame = yf.Ticker(ticker).history(
+            period=period, start=start, auto_adjust=True, raise_errors=True
+        )
+        if frame.index.tz is not None:
+            frame.index = frame.index.tz_localize(None)
+        frame = _clean_ohlcv(frame)
+        return None if frame.empty else frame
+
+
+class FixtureProvider(MarketDataProvider):
+    """
+    Offline data from a directory of <TICKER>.parquet or <TICKER>.csv files
+    with a date index and OHLCV columns.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _read(self, ticker):
+        base = os.path.join(self.directory, ticker.replace("/", "_"))
+        if os.path.exists(f"{base}.parquet"):
+            return pd.read_parquet(f"{base}.parquet")
+        if os.path.exists(f"{base}.csv"):
+            return pd.read_csv(f"{base}.csv", index_col=0, parse_dates=True)
+        return None
+
+    def download(self, tickers, period=None, start=None):
+        frames = {}
+        for ticker in tickers:
+            frame = self._read(ticker)
+            if frame is None:
+                continue
+            frame = _limit_history(_clean_ohlcv(frame.sort_index()), period, start)
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Seeded synthetic prices for offline runs and benchmarks.
+
+    Each ticker loads on a shared market factor with GARCH(1,1) volatility
+    clustering; crypto trades every calendar day, stocks on business days.
+    The same seed, ticker and end date always give the same history.
+    """
+
+    def __init__(self, seed=0, end="2025-12-31", years=20):
+        self.seed = seed
+        self.end = pd.Timestamp(end)
+        self.years = years
+        self._calendar = pd.date_range(
+            end=self.end, periods=365 * years + years // 4, freq="D"
+        )
+        self._market = self._garch_returns(
+            np.random.default_rng([seed, 0]), len(self._calendar), 0.18 / np.sqrt(365)
+        )
+
+    @staticmethod
+    def _garch_returns(rng, n, daily_vol, alpha=0.08, beta=0.9):
+        # Unit-variance GARCH(1,1) shocks scaled to the target volatility.
+        omega = 1 - alpha - beta
+        z = rng.standard_normal(n)
+        out = np.empty(n)
+        var = 1.0
+        for t in range(n):
+            out[t] = np.sqrt(var) * z[t]
+            var = omega + alpha * out[t] ** 2 + beta * var
+        return out * daily_vol
+
+    def _history(self, ticker):
+        ticker_seed = zlib.crc32(ticker.encode())
+        rng = np.random.default_rng([self.seed, ticker_seed])
+        is_crypto = get_annualization_factor(ticker) == 365
+        annual_vol = rng.uniform(0.5, 1.0) if is_crypto else rng.uniform(0.15, 0.45)
+        beta = rng.uniform(0.3, 1.0) if is_crypto else rng.uniform(0.6, 1.4)
+        annual_drift = rng.normal(0.08, 0.1)
+
+        if is_crypto:
+            mask = np.ones(len(self._calendar), dtype=bool)
+        else:
+            mask = self._calendar.dayofweek < 5
+        # Market moves on closed days roll into the next trading day.
+        market = np.add.reduceat(self._market, np.flatnonzero(mask))
+        dates = self._calendar[mask]
+        periods_per_year = 365 if is_crypto else 252
+        daily_vol = annual_vol / np.sqrt(periods_per_year)
+        market_vol = 0.18 / np.sqrt(periods_per_year)
+        idio_vol = np.sqrt(max(daily_vol**2 - (beta * market_vol) ** 2, (0.3 * daily_vol) ** 2))
+        returns = (
+            annual_drift / periods_per_year
+            + beta * market
+            + self._garch_returns(rng, len(dates), idio_vol)
+        )
+
+        close = rng.uniform(20, 500) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(
+            rng.normal(0, 0.2 * daily_vol, len(dates))
+        )
+        spread = np.abs(rng.normal(0, 0.5 * daily_vol, len(dates)))
+        return pd.DataFrame(
+            {
+                "Open": open_,
+                "High": np.maximum(open_, close) * np.exp(spread),
+                "Low": np.minimum(open_, close) * np.exp(-spread),
+                "Close": close,
+                "Volume": np.round(rng.lognormal(15, 0.5, len(dates))),
+            },
+            index=pd.DatetimeIndex(dates, name="Date"),
+        )
+
+    def download(self, tickers, period=None, start=None):
+        return {
+            ticker: _limit_history(self._history(ticker), period, start)
+            for ticker in tickers
+        }
+
+
+def _provider_from_env():
+    """
+    ALGO_RISK_DATA_PROVIDER selects the backend: "yfinance" (default),
+    "synthetic[:seed]" or "fixtures:<directory>".
+    """
+    name, _, arg = os.environ.get("ALGO_RISK_DATA_PROVIDER", "yfinance").partition(":")
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "synthetic":
+        return SyntheticProvider(seed=int(arg or 0))
+    if name == "fixtures":
+        return FixtureProvider(arg)
+    raise ValueError(f"Unknown data provider: {name}")
+
+
+_data_provider = _provider_from_env()
+
+
+def get_data_provider():
+    return _data_provider
+
+
+def set_data_provider(provider):
+    """
+    Route all price fetching through provider and drop cached histories.
+    """
+    global _data_provider
+    _data_provider = provider
+    _price_cache.clear()
+
+
+def _download_batch(tickers, **kwargs):
+    """
+    One batched request to the active provider.
+    """
+    if not tickers:
+        return {}
+    return get_data_provider().download(list(tickers), **kwargs)
+
+
+def _download_strict(tickers, **kwargs):
+    """
+    Per-ticker requests that let provider errors propagate.
+    """
+    provider = get_data_provider()
+    frames = {}
+    for ticker in tickers:
+        frame = provider.history(ticker, **kwargs)
+        if frame is not None and not frame.empty:
+            frames[ticker] = frame
+    return frames
+
+
+def _store_path(ticker):
+    return os.path.join(PRICE_STORE_DIR, f"{ticker.replace('/', '_')}.parquet")
+
+
+def _read_store(ticker):
+    path = _store_path(ticker)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def _write_store(ticker, df):
+    os.makedirs(PRICE_STORE_DIR, exist_ok=True)
+    path = _store_path(ticker)
+    # A unique temp file per writer: sessions and the warm-up thread may
+    # write the same ticker concurrently, and the last replace wins.
+    fd, tmp_path = tempfile.mkstemp(dir=PRICE_STORE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _is_store_fresh(ticker):
+    path = _store_path(ticker)
+    if not os.path.exists(path):
+        return False
+    # Both sides in epoch seconds, so the local timezone cannot skew the age.
+    return time.time() - os.path.getmtime(path) < PRICE_STORE_TTL.total_seconds()
+
+
+def update_price_store(tickers, downloader=_download_batch):
+    """
+    Bring the on-disk history of every ticker up to date.
+
+    New tickers get their full history in one batched download. Stored
+    tickers only request the bars after their last stored date; the last
+    stored bar is re-downloaded as an overlap check, and if it no longer
+    matches (a split or dividend re-adjusted the series) the full history
+    is fetched again.
+    """
+    stored = {}
+    new_tickers = []
+    for ticker in dict.fromkeys(tickers):
+        if _is_store_fresh(ticker):
+            continue
+        history = _read_store(ticker)
+        if history is None or history.empty:
+            new_tickers.append(ticker)
+        else:
+            stored[ticker] = history
+
+    if stored:
+        start = min(history.index[-1] for history in stored.values())
+        updates = downloader(list(stored), start=start.strftime("%Y-%m-%d"))
+        for ticker, history in stored.items():
+            update = updates.get(ticker)
+            if update is None:
+                # Nothing new (or the request failed); keep serving the store.
+                os.utime(_store_path(ticker))
+                continue
+            last_date = history.index[-1]
+            if last_date in update.index and not np.isclose(
+                update.at[last_date, "Close"], history.at[last_date, "Close"], rtol=1e-6
+            ):
+                new_tickers.append(ticker)
+                continue
+            appended = update[update.index > last_date]
+            if appended.empty:
+                os.utime(_store_path(ticker))
+            else:
+                _write_store(ticker, pd.concat([history, appended]))
+
+    for ticker, history in downloader(new_tickers, period="max").items():
+        _write_store(ticker, history)
+
+
+def _period_rank(period):
+    if period not in _PERIOD_ORDER:
+        raise ValueError(f"Unsupported period: {period}")
+    return _PERIOD_ORDER.index(period)
+
+
+def _period_cutoff(last_date, period):
+    if period == "ytd":
+        return pd.Timestamp(year=last_date.year, month=1, day=1, tz=last_date.tz)
+    return last_date - _PERIOD_OFFSETS[period]
+
+
+def slice_period(df, period):
+    """
+    Rows of a date-indexed frame that fall inside a yfinance-style period
+    ("1mo", "1y", "ytd", "max", ...), measured back from its last date.
+    The cut-off is binary-searched and the result is a view, not a copy.
+    """
+    _period_rank(period)
+    if df.empty or period == "max":
+        return df
+    start = df.index.searchsorted(_period_cutoff(df.index[-1], period), side="right")
+    return df.iloc[start:]
+
+
+def load_price_history(tickers, downloader=_download_batch):
+    """
+    Full history per ticker. Persistent providers go through the on-disk
+    store (refreshed first); offline providers are read directly.
+    """
+    if not get_data_provider().persistent:
+        return downloader(list(dict.fromkeys(tickers)), period="max")
+    update_price_store(tickers, downloader=downloader)
+    histories = {}
+    for ticker in dict.fromkeys(tickers):
+        history = _read_store(ticker)
+        if history is not None and not history.empty:
+            histories[ticker] = history
+    return histories
+
+
+def fetch_price_history(tickers, period="1y", downloader=_download_batch):
+    """
+    Return {ticker: OHLCV frame} for every ticker.
+
+    Each ticker is loaded once for at least HISTORY_WINDOW and every shorter
+    period is a view of that frame. The window is only widened (re-read from
+    the on-disk store) when a longer period is requested.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    rank = _period_rank(period)
+    missing = [
+        t for t in tickers
+        if t not in _price_cache or _period_rank(_price_cache[t][0]) < rank
+    ]
+    if missing:
+        window = max(period, HISTORY_WINDOW, key=_period_rank)
+        for ticker, history in load_price_history(missing, downloader=downloader).items():
+            _price_cache[ticker] = (
+                window,
+                _prepare_price_frame(slice_period(history, window)),
+            )
+    return {
+        t: slice_period(_price_cache[t][1], period) for t in tickers if t in _price_cache
+    }
+
+
+class WarmUpStatus:
+    """
+    Progress of a universe warm-up, safe to read from any thread.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    def _record(self, loaded, failed):
+        with self._lock:
+            self.done += loaded + len(failed)
+            self.failed.update(failed)
+
+
+class _RateLimiter:
+    """
+    Spaces calls at least min_interval seconds apart across threads.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.min_interval
+        return delay
+
+    async def wait_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# Shared per remote host so every pipeline run respects the same budget.
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+def _host_limiter(host, requests_per_second):
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = _host_limiters[host] = _RateLimiter(1.0 / requests_per_second)
+        return limiter
+
+
+def _is_throttled(exc):
+    message = str(exc).lower()
+    return (
+        "ratelimit" in type(exc).__name__.lower()
+        or "too many requests" in message
+        or "rate limit" in message
+    )
+
+
+def _is_missing_data(exc):
+    return "missing" in type(exc).__name__.lower()
+
+
+async def fetch_price_history_async(
+    tickers,
+    period="1y",
+    max_concurrency=8,
+    requests_per_second=4.0,
+    max_retries=4,
+    base_delay=1.0,
+):
+    """
+    Fetch every ticker concurrently and return (frames, errors).
+
+    At most max_concurrency tickers are in flight, requests to the same
+    provider host are spaced to requests_per_second, and throttled or
+    failed requests are retried with exponential backoff. Tickers that
+    still fail are reported in errors ({ticker: message}) while the rest
+    are returned as usual.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    host = get_data_provider().host
+    limiter = _host_limiter(host, requests_per_second) if host else None
+    semaphore = asyncio.Semaphore(max_concurrency)
+    frames = {}
+    errors = {}
+
+    async def load(ticker):
+        async with semaphore:
+            for attempt in range(max_retries + 1):
+                if limiter is not None:
+                    await limiter.wait_async()
+                try:
+                    loaded = await asyncio.to_thread(
+                        fetch_price_history, [ticker], period, _download_strict
+                    )
+                except Exception as exc:
+                    if _is_missing_data(exc) or attempt == max_retries:
+                        errors[ticker] = f"{type(exc).__name__}: {exc}"
+                        return
+                    delay = base_delay * 2**attempt
+                    if _is_throttled(exc):
+                        delay *= 2
+                    await asyncio.sleep(delay * (1 + random.random()))
+                    continue
+                if ticker in loaded:
+                    frames[ticker] = loaded[ticker]
+                else:
+                    errors[ticker] = "no data returned"
+                return
+
+    await asyncio.gather(*(load(ticker) for ticker in tickers))
+    return frames, errors
+
+
+def fetch_price_history_concurrent(tickers, period="1y", **kwargs):
+    """
+    Blocking entry point to fetch_price_history_async for Streamlit pages
+    and batch scripts; safe to call while another event loop is running.
+    """
+    coroutine = fetch_price_history_async(tickers, period=period, **kwargs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
+
+def warm_up_universe(
+    tickers,
+    period=HISTORY_WINDOW,
+    batch_size=25,
+    max_concurrency=4,
+    requests_per_second=4.0,
+    max_retries=3,
+    status=None,
+):
+    """
+    Prefetch and pre-process every ticker into the price cache.
+
+    Batches go through fetch_price_history_async, so tickers are fetched
+    one request each on the lock-free provider.history path, up to
+    max_concurrency at a time, spaced per host and retried with backoff.
+    status is updated after every batch; tickers that still fail are
+    reported in status.failed.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if status is None:
+        status = WarmUpStatus(len(tickers))
+    for start in range(0, len(tickers), batch_size):
+        batch = tickers[start : start + batch_size]
+        frames, errors = fetch_price_history_concurrent(
+            batch,
+            period=period,
+            max_concurrency=max_concurrency,
+            requests_per_second=requests_per_second,
+            max_retries=max_retries,
+        )
+        status._record(len(frames), errors)
+    status.finished = True
+    return status
+
+
+def start_universe_warm_up(tickers, **kwargs):
+    """
+    Run warm_up_universe on a daemon thread and return its live status.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    status = WarmUpStatus(len(tickers))
+    thread = threading.Thread(
+        target=warm_up_universe,
+        args=(tickers,),
+        kwargs={**kwargs, "status": status},
+        name="universe-warm-up",
+        daemon=True,
+    )
+    thread.start()
+    return status
+
+
+def get_stock_data(ticker, period="1y"):
+    """
+    OHLCV + Log_Return for one ticker. The frame is a shallow view of the
+    read-only cached arrays, so repeated calls cost no copies.
+    """
+    frames = fetch_price_history([ticker], period=period)
+    if ticker not in frames:
+        return pd.DataFrame()
+    return frames[ticker].copy(deep=False)
+
+
+def add_indicators(df, dtype=np.float64):
+    """
+    SMA_20/50/200 and RSI as a separate frame on df's index; df itself is
+    not modified. Pass dtype=np.float32 for a more compact result.
+    """
+    close = df["Close"]
+    delta = close.diff()
     gain = delta.where(delta > 0, 0).rolling(14).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
     rs = gain / loss
-    df["RSI"] = 100 - (100 / (1 + rs))
-    return df
+    indicators = {
+        "SMA_20": close.rolling(20).mean(),
+        "SMA_50": close.rolling(50).mean(),
+        "SMA_200": close.rolling(200).mean(),
+        "RSI": 100 - (100 / (1 + rs)),
+    }
+    return pd.DataFrame(
+        {name: values.to_numpy(dtype=dtype) for name, values in indicators.items()},
+        index=df.index,
+        copy=False,
+    )
+
+
+def rolling_volatility(df, annualization_factor=252, window=21):
+    """
+    Annualized rolling volatility of df["Log_Return"] as a new Series.
+    """
+    return df["Log_Return"].rolling(window).std() * np.sqrt(annualization_factor)
+
+
+# Chart preparation: figures are downsampled to roughly the plot's pixel
+# width before being serialized, and large marker clouds use WebGL.
+CHART_WIDTH_PX = 1200
+MAX_CANDLES = 400
+MAX_SCATTER_POINTS = 20000
+WEBGL_POINT_THRESHOLD = 5000
+
+
+def lttb_indices(y, n_out, x=None):
+    """
+    Largest-Triangle-Three-Buckets: positions of n_out points that keep
+    the visual shape of the (x, y) line. Always keeps the first and last.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[anchor] - avg_x) * (y[start:stop] - y[anchor])
+            - (x[anchor] - x[start:stop]) * (avg_y - y[anchor])
+        )
+        anchor = start + int(area.argmax())
+        selected[i + 1] = anchor
+    return selected
+
+
+def downsample_series(series, max_points=CHART_WIDTH_PX):
+    """
+    Shape-preserving (LTTB) subset of a date-indexed series, NaNs dropped.
+    """
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else None
+    return series.iloc[lttb_indices(series.to_numpy(dtype=float), max_points, x=x)]
+
+
+def downsample_ohlc(df, max_bars=MAX_CANDLES):
+    """
+    Merge consecutive bars so at most max_bars candles remain: first open,
+    highest high, lowest low and last close of each group.
+    """
+    n = len(df)
+    if n <= max_bars:
+        return df[["Open", "High", "Low", "Close"]]
+    size = -(-n // max_bars)
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    return pd.DataFrame(
+        {
+            "Open": df["Open"].to_numpy()[starts],
+            "High": np.maximum.reduceat(df["High"].to_numpy(), starts),
+            "Low": np.minimum.reduceat(df["Low"].to_numpy(), starts),
+            "Close": df["Close"].to_numpy()[ends],
+        },
+        index=df.index[starts],
+    )
+
+
+def scatter_trace_type(n_points):
+    """
+    go.Scattergl above WEBGL_POINT_THRESHOLD points, go.Scatter otherwise.
+    """
+    return go.Scattergl if n_points > WEBGL_POINT_THRESHOLD else go.Scatter
 
 
 def volatility_analysis(df, ticker=None, annualization_factor=None):
     if annualization_factor is None:
         annualization_factor = get_annualization_factor(ticker) if ticker else 252
-    df["Volatility"] = df["Log_Return"].rolling(21).std() * np.sqrt(annualization_factor)
+    volatility = downsample_series(rolling_volatility(df, annualization_factor))
     fig = go.Figure()
     fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df["Volatility"],
+        scatter_trace_type(len(volatility))(
+            x=volatility.index,
+            y=volatility.to_numpy(),
             mode="lines",
             name="Annualized Volatility (21-day)",
             line=dict(color="blue", width=2),
         )
     )
     # lines in 80  and 20 levels
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=[80 / 100] * len(df),
-            mode="lines",
-            name="80%",
-            line=dict(color="red", dash="dash"),
-        )
+    fig.add_hline(
+        y=80 / 100,
+        line=dict(color="red", dash="dash"),
+        annotation_text="80%",
+        annotation_position="top left",
     )
-    fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=[20 / 100] * len(df),
-            mode="lines",
-            name="20%",
-            line=dict(color="orange", dash="dash"),
-        )
+    fig.add_hline(
+        y=20 / 100,
+        line=dict(color="orange", dash="dash"),
+        annotation_text="20%",
+        annotation_position="bottom left",
     )
 
     fig.update_layout(
@@ -85,130 +842,1849 @@ def volatility_analysis(df, ticker=None, annualization_factor=None):
     return fig
 
 
-@st.cache_data
-def get_portfolio_history(symbols, period="1y"):
-    portfolio_df = pd.DataFrame()
+class RollingWindowStats:
+    """
+    Fixed-window running mean and sample standard deviation, O(1) per update.
+
+    Values live in a ring buffer; mean and M2 are maintained with Welford
+    add/remove steps and recomputed from the buffer once per full lap to
+    stop floating-point drift. Like pandas rolling(window), results are
+    NaN until the window holds `window` non-NaN values.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._buffer = [np.nan] * window
+        self._pos = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def _add(self, x):
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        self._count -= 1
+        if self._count == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / self._count
+        self._m2 -= delta * (x - self._mean)
+
+    def _recompute(self):
+        buffer = np.array(self._buffer)
+        valid = buffer[~np.isnan(buffer)]
+        self._count = len(valid)
+        self._mean = float(valid.mean()) if len(valid) else 0.0
+        self._m2 = float(((valid - self._mean) ** 2).sum()) if len(valid) else 0.0
+
+    def seed(self, values):
+        """
+        Load the last `window` values of a history in one vectorized step.
+        """
+        tail = np.asarray(values, dtype=float)[-self.window :]
+        self._buffer = [np.nan] * (self.window - len(tail)) + tail.tolist()
+        self._pos = 0
+        self._recompute()
+        return self
+
+    def update(self, x):
+        x = float(x)
+        old = self._buffer[self._pos]
+        self._buffer[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        if self._pos == 0:
+            self._recompute()
+            return
+        if old == old:
+            self._remove(old)
+        if x == x:
+            self._add(x)
+
+    @property
+    def mean(self):
+        return self._mean if self._count == self.window else np.nan
+
+    @property
+    def std(self):
+        if self._count < self.window or self.window < 2:
+            return np.nan
+        return np.sqrt(max(self._m2, 0.0) / (self.window - 1))
+
+
+class IncrementalIndicators:
+    """
+    Live SMA_20/50/200, RSI and annualized 21-day volatility for one ticker.
+
+    Seed once with from_history(), then call update() with each new close;
+    every value matches the last row of add_indicators/volatility_analysis.
+    """
+
+    SMA_WINDOWS = (20, 50, 200)
+
+    def __init__(self, annualization_factor=252, rsi_window=14, volatility_window=21):
+        self.annualization_factor = annualization_factor
+        self._sma = {window: RollingWindowStats(window) for window in self.SMA_WINDOWS}
+        self._gain = RollingWindowStats(rsi_window)
+        self._loss = RollingWindowStats(rsi_window)
+        self._returns = RollingWindowStats(volatility_window)
+        self._last_close = np.nan
+
+    @classmethod
+    def from_history(cls, df, annualization_factor=252, **kwargs):
+        indicators = cls(annualization_factor=annualization_factor, **kwargs)
+        close = df["Close"].to_numpy(dtype=float)
+        if len(close) == 0:
+            return indicators
+        delta = np.diff(close, prepend=np.nan)
+        # Matches delta.where(delta > 0, 0): the first (NaN) delta counts as 0.
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        for stats in indicators._sma.values():
+            stats.seed(close)
+        indicators._gain.seed(gain)
+        indicators._loss.seed(loss)
+        indicators._returns.seed(np.log(close / np.concatenate([[np.nan], close[:-1]])))
+        indicators._last_close = close[-1]
+        return indicators
+
+    def update(self, close):
+        close = float(close)
+        delta = close - self._last_close
+        for stats in self._sma.values():
+            stats.update(close)
+        self._gain.update(delta if delta > 0 else 0.0)
+        self._loss.update(-delta if delta < 0 else 0.0)
+        # NaN previous close (first bar) gives a NaN return, as in Log_Return.
+        log_return = math.log(close / self._last_close) if self._last_close > 0 else np.nan
+        self._returns.update(log_return)
+        self._last_close = close
+        return self.latest()
+
+    def latest(self):
+        values = {f"SMA_{window}": stats.mean for window, stats in self._sma.items()}
+        gain, loss = self._gain.mean, self._loss.mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = np.float64(gain) / np.float64(loss)
+            values["RSI"] = float(100 - (100 / (1 + rs)))
+        values["Volatility"] = self._returns.std * np.sqrt(self.annualization_factor)
+        return values
+
+
+def _window_sums(cumsum, window):
+    """
+    Trailing `window`-row sums of every column from its cumulative sum.
+    Rows with fewer than `window` observations are NaN.
+    """
+    sums = np.full(cumsum.shape, np.nan)
+    if len(cumsum) >= window:
+        sums[window - 1] = cumsum[window - 1]
+        sums[window:] = cumsum[window:] - cumsum[:-window]
+    return sums
+
+
+def panel_indicators(
+    close,
+    annualization_factor=252,
+    sma_windows=(20, 50, 200),
+    rsi_window=14,
+    volatility_window=21,
+    dtype=np.float64,
+):
+    """
+    SMA, RSI and annualized rolling volatility for every column of a
+    (dates x tickers) close array in one vectorized pass.
+
+    NaN prices (e.g. stock columns on crypto weekends) are skipped, so each
+    column matches add_indicators/volatility_analysis run on that ticker
+    alone. annualization_factor may be a scalar or one factor per column.
+    Returns {indicator name: (dates x tickers) array of dtype}.
+    """
+    close = np.asarray(close, dtype=float)
+    if close.ndim == 1:
+        close = close[:, None]
+
+    # Pack each column's valid prices to the top so every window is dense,
+    # then scatter the results back to the original rows at the end.
+    missing = np.isnan(close)
+    order = np.argsort(missing, axis=0, kind="stable")
+    packed = np.take_along_axis(close, order, axis=0)
+    valid_rows = (~missing).sum(axis=0)
+    in_range = np.arange(len(close))[:, None] < valid_rows
+
+    results = {}
+    for window in sma_windows:
+        results[f"SMA_{window}"] = _window_sums(np.cumsum(packed, axis=0), window) / window
+
+    delta = np.diff(packed, axis=0, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _window_sums(np.cumsum(gain, axis=0), rsi_window) / rsi_window
+    avg_loss = _window_sums(np.cumsum(loss, axis=0), rsi_window) / rsi_window
+    with np.errstate(divide="ignore", invalid="ignore"):
+        results["RSI"] = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        log_returns = np.log(packed[1:] / packed[:-1])
+        log_returns = np.vstack([np.full((1, packed.shape[1]), np.nan), log_returns])
+    # Returns are demeaned per column before the sums of squares to avoid
+    # cancellation; the first return is NaN, so windows start one row later.
+    finite = ~np.isnan(log_returns)
+    column_mean = np.where(finite, log_returns, 0.0).sum(axis=0) / np.maximum(finite.sum(axis=0), 1)
+    centered = np.where(finite, log_returns - column_mean, 0.0)
+    sums = _window_sums(np.cumsum(centered, axis=0), volatility_window)
+    squares = _window_sums(np.cumsum(centered**2, axis=0), volatility_window)
+    variance = (squares - sums**2 / volatility_window) / (volatility_window - 1)
+    variance[:volatility_window] = np.nan
+    results["Volatility"] = np.sqrt(np.maximum(variance, 0.0)) * np.sqrt(
+        np.asarray(annualization_factor, dtype=float)
+    )
+
+    rows = order
+    columns = np.broadcast_to(np.arange(close.shape[1]), close.shape)
+    for name, packed_values in results.items():
+        values = np.full(close.shape, np.nan, dtype=dtype)
+        values[rows[in_range], columns[in_range]] = packed_values[in_range]
+        results[name] = values
+    return results
+
+
+def build_close_panel(frames, tickers):
+    """
+    (dates x tickers) close prices on the union of the tickers' dates,
+    NaN where a ticker has no bar. Returns (values, dates).
+    """
+    dates = pd.DatetimeIndex([])
+    for ticker in tickers:
+        if ticker in frames:
+            dates = dates.union(frames[ticker].index)
+    values = np.full((len(dates), len(tickers)), np.nan)
+    for j, ticker in enumerate(tickers):
+        if ticker in frames:
+            values[dates.get_indexer(frames[ticker].index), j] = frames[ticker]["Close"].to_numpy()
+    return values, dates
+
+
+def latest_indicators(symbols, period="1y", dtype=np.float32):
+    """
+    Latest SMA/RSI/volatility per ticker for universe-wide technical scans,
+    as a compact frame indexed by ticker.
+    """
+    symbols = list(symbols)
+    frames = fetch_price_history(symbols, period=period)
+    close, _ = build_close_panel(frames, symbols)
+    indicators = panel_indicators(
+        close,
+        annualization_factor=security_master.annualization_factors(symbols),
+        dtype=dtype,
+    )
+    last_row = len(close) - 1 - np.argmax(~np.isnan(close[::-1]), axis=0)
+    return pd.DataFrame(
+        {name: values[last_row, np.arange(len(symbols))] for name, values in indicators.items()},
+        index=pd.Index(symbols, name="Ticker"),
+    )
+
+
+class ReturnsPanel:
+    """
+    Dense (dates x tickers) log-return panel on one explicit calendar.
+
+    values is a C-contiguous float64 array with NaN where mask is False,
+    so engines can use it directly without any further alignment.
+    """
+
+    def __init__(self, values, mask, dates, tickers):
+        self.values = values
+        self.mask = mask
+        self.dates = dates
+        self.tickers = list(tickers)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def to_frame(self):
+        # Wraps values without copying them.
+        return pd.DataFrame(self.values, index=self.dates, columns=self.tickers, copy=False)
+
+
+def build_returns_panel(frames, tickers, calendar="trading"):
+    """
+    Align per-ticker Log_Return series onto one calendar in a single pass.
+
+    calendar:
+      "trading"   - union of the non-crypto tickers' dates (all dates for an
+                    all-crypto basket); returns on days outside it, e.g. crypto
+                    weekends, are summed into the next calendar day.
+      "union"     - union of every ticker's dates, missing bars left invalid.
+      "intersect" - only dates on which every ticker has a return.
+    """
+    series = {}
+    for ticker in tickers:
+        if ticker in frames:
+            returns = frames[ticker]["Log_Return"]
+            series[ticker] = returns[np.isfinite(returns.to_numpy())]
+
+    def union_of(names):
+        dates = pd.DatetimeIndex([])
+        for name in names:
+            dates = dates.union(series[name].index)
+        return dates
+
+    if calendar == "trading":
+        stock_tickers = [t for t in series if get_annualization_factor(t) != 365]
+        dates = union_of(stock_tickers or list(series))
+    elif calendar == "union":
+        dates = union_of(series)
+    elif calendar == "intersect":
+        dates = union_of(series)
+        for returns in series.values():
+            dates = dates.intersection(returns.index)
+    else:
+        raise ValueError(f"Unknown calendar: {calendar}")
+
+    values = np.full((len(dates), len(tickers)), np.nan)
+    mask = np.zeros((len(dates), len(tickers)), dtype=bool)
+    for j, ticker in enumerate(tickers):
+        if ticker not in series:
+            continue
+        returns = series[ticker]
+        positions = dates.searchsorted(returns.index, side="left")
+        if calendar == "trading":
+            # Log returns are additive: off-calendar days fold forward into
+            # the next calendar date. Returns before the first calendar date
+            # have no previous date to fold from and are dropped.
+            keep = (positions < len(dates)) & (returns.index >= dates[0])
+            column = np.bincount(
+                positions[keep], weights=returns.to_numpy()[keep], minlength=len(dates)
+            )
+            counts = np.bincount(positions[keep], minlength=len(dates))
+        else:
+            keep = (positions < len(dates)) & (
+                dates[np.minimum(positions, len(dates) - 1)] == returns.index
+            )
+            column = np.zeros(len(dates))
+            column[positions[keep]] = returns.to_numpy()[keep]
+            counts = np.zeros(len(dates), dtype=int)
+            counts[positions[keep]] = 1
+        valid = counts > 0
+        values[valid, j] = column[valid]
+        mask[:, j] = valid
+
+    return ReturnsPanel(values, mask, dates, tickers)
+
+
+@st.cache_resource
+def get_returns_panel(symbols, period="1y", calendar="trading"):
+    # Shared across sessions without copying; the arrays are read-only.
+    symbols = list(symbols)
+    frames = fetch_price_history(symbols, period=period)
+    panel = build_returns_panel(frames, symbols, calendar=calendar)
+    panel.values.flags.writeable = False
+    panel.mask.flags.writeable = False
+    return panel
+
+
+def get_portfolio_history(symbols, period="1y", calendar="trading"):
+    return get_returns_panel(symbols, period=period, calendar=calendar).to_frame()
+
+
+def portfolio_performance_with_data(portfolio_df, weights, period="1y", annualization_factor=252):
+    expected_returns, covariance_matrix = portfolio_moments(
+        portfolio_df, annualization_factor=annualization_factor
+    )
+    weights = np.array(weights)
+    portfolio_return = np.sum(expected_returns * weights)
+    portfolio_volatility = np.sqrt(
+        np.dot(weights.T, np.dot(covariance_matrix, weights))
+    )
+    return portfolio_return, portfolio_volatility
+
+
+class HorizonReturnIndex:
+    """
+    Cumulative log-return index over the rows where every asset has a
+    return: cumulative[t] is the sum of the first t returns.
+
+    Overlapping h-day returns are cumulative[h:] - cumulative[:-h], the same
+    values as rolling(h).sum() without any rolling-window objects. Because
+    the index is linear in the returns, a portfolio's index is the
+    per-asset index times the weights.
+    """
+
+    def __init__(self, returns, dates=None):
+        returns = np.asarray(returns, dtype=float)
+        self.is_panel = returns.ndim == 2
+        values = returns if self.is_panel else returns[:, None]
+        valid = ~np.isnan(values).any(axis=1)
+        self.dates = None if dates is None else dates[valid]
+        self.cumulative = np.vstack(
+            [np.zeros((1, values.shape[1])), np.cumsum(values[valid], axis=0)]
+        )
+        if not self.is_panel:
+            self.cumulative = self.cumulative[:, 0]
+
+    @classmethod
+    def from_returns(cls, returns):
+        """
+        Build from a return Series or a (dates x tickers) return frame.
+        """
+        return cls(returns.to_numpy(dtype=float), dates=returns.index)
+
+    def __len__(self):
+        return len(self.cumulative) - 1
+
+    def portfolio(self, weights):
+        """
+        Index of a weighted portfolio, combined linearly from the panel.
+        """
+        index = HorizonReturnIndex.__new__(HorizonReturnIndex)
+        index.is_panel = False
+        index.dates = self.dates
+        index.cumulative = self.cumulative @ np.asarray(weights, dtype=float)
+        return index
+
+    def horizon_returns(self, day, weights=None):
+        """
+        Overlapping day-length log returns (per asset for a panel index,
+        or for the weighted portfolio when weights are given).
+        """
+        cumulative = self.cumulative
+        if weights is not None:
+            cumulative = cumulative @ np.asarray(weights, dtype=float)
+        if day > len(cumulative) - 1:
+            return cumulative[:0]
+        return cumulative[day:] - cumulative[:-day]
+
+    def max_drawdown(self, weights=None):
+        """
+        Largest peak-to-trough loss as a simple return (e.g. 0.25 = -25%).
+        """
+        cumulative = self.cumulative
+        if weights is not None:
+            cumulative = cumulative @ np.asarray(weights, dtype=float)
+        drawdown = cumulative - np.maximum.accumulate(cumulative, axis=0)
+        return 1 - np.exp(drawdown.min(axis=0))
+
+
+@st.cache_resource
+def get_horizon_index(symbols, period="1y", calendar="trading"):
+    """
+    Shared HorizonReturnIndex over the same panel get_portfolio_history
+    returns, built once per (symbols, period, calendar). Pass it as
+    horizon_index to the historical VaR functions. The cumulative array is
+    read-only because every session shares it.
+    """
+    index = HorizonReturnIndex.from_returns(
+        get_portfolio_history(symbols, period=period, calendar=calendar)
+    )
+    index.cumulative.flags.writeable = False
+    return index
+
+
+def _horizon_index(returns, horizon_index=None):
+    """
+    horizon_index if the caller has one (e.g. from get_horizon_index),
+    otherwise a fresh index over returns.
+    """
+    if horizon_index is not None:
+        return horizon_index
+    return HorizonReturnIndex.from_returns(returns)
+
+
+def calculate_parametric_var(df, portfolio_value=100000, confidence_level=0.95, day=1, annualization_factor=252):
+    """
+    Hull'un 'Linear Model'ini (Parametrik VaR) kullanarak riski hesaplar.
+    """
+
+    if "Volatility" in df:
+        current_annual_volatility = df["Volatility"].iloc[-1]
+    else:
+        current_annual_volatility = rolling_volatility(df, annualization_factor).iloc[-1]
+
+    daily_volatility = current_annual_volatility / np.sqrt(annualization_factor)
+
+    z_score = norm.ppf(confidence_level)
+
+    var_value = portfolio_value * daily_volatility * z_score * np.sqrt(day)
+
+    return var_value, current_annual_volatility
+
+
+def calculate_historical_var(
+    df, portfolio_value=100000, confidence_level=0.95, day=1, horizon_index=None
+):
+    """
+    Tarihsel Simülasyon yöntemi ile VaR hesaplar.
+    """
+
+    # 1. Eğer vade 1 günden fazlaysa, geçmişteki o vadeli getirileri oluştur
+    period_returns = _horizon_index(df["Log_Return"], horizon_index).horizon_returns(day)
+
+    # VaR yüzdesini hesapla
+    var_percentile = np.percentile(period_returns, (1 - confidence_level) * 100)
+
+    var_value = portfolio_value * abs(var_percentile)
+
+    return var_value
+
+
+def parametric_var_portfolio(
+    df_portfolio, weights, portfolio_value=100000, confidence_level=0.95, day=1, annualization_factor=252
+):
+    """
+    Portföy için Hull'un 'Linear Model'ini (Parametrik VaR) kullanarak riski hesaplar.
+    """
+    weights = np.array(weights)
+
+    portfolio_volatility = portfolio_performance_with_data(df_portfolio, weights, annualization_factor=annualization_factor)[1]
+
+    daily_volatility = portfolio_volatility / np.sqrt(annualization_factor)
+
+    z_score = norm.ppf(confidence_level)
+
+    var_value = portfolio_value * daily_volatility * z_score * np.sqrt(day)
+
+    return var_value, portfolio_volatility
+
+
+def historical_var_portfolio(
+    df_portfolio,
+    weights,
+    portfolio_value=100000,
+    confidence_level=0.95,
+    day=1,
+    horizon_index=None,
+):
+    """
+    Portföy için 'Historical Simulation' (Gerçek Veri) VaR hesabı.
+    Ağırlıklandırılmış geçmiş getirileri kullanır.
+    """
+    # 2. ADIM: Vadeli getiriler kümülatif indeksin farkından (rolling sum yerine)
+    portfolio_historical_returns = _horizon_index(
+        df_portfolio, horizon_index
+    ).horizon_returns(day, weights)
+
+    # 3. ADIM: Percentile
+    var_percentile = np.percentile(
+        portfolio_historical_returns, (1 - confidence_level) * 100
+    )
+
+    return portfolio_value * abs(var_percentile)
+
+
+def batch_portfolio_risk(
+    df_portfolio,
+    weights_matrix,
+    portfolio_value=100000,
+    confidence_level=0.95,
+    day=1,
+    annualization_factor=252,
+    chunk_size=2000,
+    horizon_index=None,
+):
+    """
+    Return, volatility, parametric VaR and historical VaR/ES for every row
+    of a (P x N) weights matrix against one returns panel.
+
+    Moments and the horizon-return panel are built once. Each chunk of
+    portfolios is then one matrix product for the scenario P&L and one
+    np.partition for the quantiles, so memory is bounded by chunk_size
+    rather than P. Matches portfolio_performance_with_data,
+    parametric_var_portfolio and historical_var_portfolio row by row. A
+    weights DataFrame is aligned to the panel columns and keeps its index.
+    portfolio_value may be one value per portfolio.
+    """
+    index = None
+    if isinstance(weights_matrix, pd.DataFrame):
+        index = weights_matrix.index
+        weights_matrix = weights_matrix.reindex(columns=df_portfolio.columns, fill_value=0.0)
+    weights_matrix = np.atleast_2d(np.asarray(weights_matrix, dtype=float))
+    portfolio_value = np.broadcast_to(
+        np.asarray(portfolio_value, dtype=float), (len(weights_matrix),)
+    )
+
+    expected_returns, covariance_matrix = portfolio_moments(df_portfolio, annualization_factor)
+    portfolio_returns, portfolio_volatilities = batch_portfolio_performance(
+        expected_returns, covariance_matrix, weights_matrix
+    )
+    daily_volatilities = portfolio_volatilities / np.sqrt(annualization_factor)
+    parametric_var = (
+        portfolio_value * daily_volatilities * norm.ppf(confidence_level) * np.sqrt(day)
+    )
+
+    asset_returns = _horizon_index(df_portfolio, horizon_index).horizon_returns(day)
+    historical_var = np.full(len(weights_matrix), np.nan)
+    historical_es = np.full(len(weights_matrix), np.nan)
+    if len(asset_returns):
+        position = (1 - confidence_level) * (len(asset_returns) - 1)
+        lower = int(np.floor(position))
+        upper = min(lower + 1, len(asset_returns) - 1)
+        fraction = position - lower
+        for start in range(0, len(weights_matrix), chunk_size):
+            stop = min(start + chunk_size, len(weights_matrix))
+            # (scenarios x portfolios) horizon returns in one GEMM.
+            scenarios = asset_returns @ weights_matrix[start:stop].T
+            ordered = np.partition(scenarios, (lower, upper), axis=0)
+            cutoffs = ordered[lower] + (ordered[upper] - ordered[lower]) * fraction
+            tail = scenarios <= cutoffs
+            tail_counts = tail.sum(axis=0)
+            tail_means = np.where(tail, scenarios, 0.0).sum(axis=0) / np.maximum(tail_counts, 1)
+            # Same fallback as var_surface: the worst scenario if the tail is empty.
+            tail_means = np.where(tail_counts > 0, tail_means, ordered[0])
+            historical_var[start:stop] = portfolio_value[start:stop] * np.abs(cutoffs)
+            historical_es[start:stop] = portfolio_value[start:stop] * np.abs(tail_means)
+
+    return pd.DataFrame(
+        {
+            "Return": portfolio_returns,
+            "Volatility": portfolio_volatilities,
+            "Parametric VaR": parametric_var,
+            "Historical VaR": historical_var,
+            "Historical ES": historical_es,
+        },
+        index=index,
+    )
+
+
+class SlidingQuantile:
+    """
+    Quantiles of the last `window` values. A ring buffer remembers arrival
+    order for eviction while a sorted list answers quantile queries, so
+    each step is a binary-search insert/remove instead of a re-sort.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._ring = collections.deque()
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def push(self, x):
+        if len(self._ring) == self.window:
+            old = self._ring.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._ring.append(x)
+        bisect.insort(self._sorted, x)
+
+    def percentile(self, q):
+        """
+        Same as np.percentile(window, q) with linear interpolation.
+        """
+        position = q / 100 * (len(self._sorted) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self._sorted) - 1)
+        low_value = self._sorted[lower]
+        return low_value + (self._sorted[upper] - low_value) * (position - lower)
+
+
+# Fewer out-of-sample days than this give coverage tests with almost no
+# power (about 12 expected exceptions at 95%), so they are not reported.
+MIN_BACKTEST_OBSERVATIONS = 250
+
+
+def var_coverage_tests(exceptions, confidence_level=0.95):
+    """
+    Kupiec proportion-of-failures, Christoffersen independence and
+    conditional-coverage likelihood-ratio tests for a VaR exception series.
+    """
+    hits = np.asarray(exceptions, dtype=bool)
+    n = len(hits)
+    x = int(hits.sum())
+    p = 1 - confidence_level
+    result = {
+        "observations": n,
+        "exceptions": x,
+        "expected_exceptions": n * p,
+        "exception_rate": x / n if n else np.nan,
+    }
+    if n == 0:
+        statistics = ["kupiec", "christoffersen", "conditional_coverage"]
+        return {
+            **result,
+            **{f"{name}_lr": np.nan for name in statistics},
+            **{f"{name}_pvalue": np.nan for name in statistics},
+        }
+
+    rate = x / n
+    kupiec_lr = -2 * (
+        xlogy(n - x, 1 - p) + xlogy(x, p) - xlogy(n - x, 1 - rate) - xlogy(x, rate)
+    )
+
+    previous, current = hits[:-1], hits[1:]
+    n00 = int(np.sum(~previous & ~current))
+    n01 = int(np.sum(~previous & current))
+    n10 = int(np.sum(previous & ~current))
+    n11 = int(np.sum(previous & current))
+    pi0 = n01 / (n00 + n01) if n00 + n01 else 0.0
+    pi1 = n11 / (n10 + n11) if n10 + n11 else 0.0
+    pi = (n01 + n11) / (n00 + n01 + n10 + n11) if n > 1 else 0.0
+    christoffersen_lr = -2 * (
+        xlogy(n00 + n10, 1 - pi)
+        + xlogy(n01 + n11, pi)
+        - xlogy(n00, 1 - pi0)
+        - xlogy(n01, pi0)
+        - xlogy(n10, 1 - pi1)
+        - xlogy(n11, pi1)
+    )
+    conditional_coverage_lr = kupiec_lr + christoffersen_lr
+    return {
+        **result,
+        "kupiec_lr": float(kupiec_lr),
+        "kupiec_pvalue": float(chi2.sf(kupiec_lr, 1)),
+        "christoffersen_lr": float(christoffersen_lr),
+        "christoffersen_pvalue": float(chi2.sf(christoffersen_lr, 1)),
+        "conditional_coverage_lr": float(conditional_coverage_lr),
+        "conditional_coverage_pvalue": float(chi2.sf(conditional_coverage_lr, 2)),
+    }
+
+
+def backtest_var(
+    returns, portfolio_value=100000, confidence_level=0.95, window=250, method="historical"
+):
+    """
+    Rolling one-day VaR forecast from the previous `window` returns,
+    compared with the realized return of each day.
+
+    method is "historical" (sliding percentile, as historical_var_portfolio)
+    or "parametric" (sliding zero-mean normal, as parametric_var_portfolio).
+    Returns (frame, tests): frame has Return, VaR (currency), Threshold (the
+    VaR as a return) and Exception per day; tests is var_coverage_tests().
+    """
+    returns = returns.dropna()
+    values = returns.to_numpy(dtype=float)
+    n = max(len(values) - window, 0)
+    thresholds = np.empty(n)
+    if method == "historical":
+        quantiles = SlidingQuantile(window)
+        q = (1 - confidence_level) * 100
+        for x in values[:window]:
+            quantiles.push(x)
+        for t in range(n):
+            thresholds[t] = -abs(quantiles.percentile(q))
+            quantiles.push(values[window + t])
+    elif method == "parametric":
+        stats = RollingWindowStats(window).seed(values[:window])
+        z_score = norm.ppf(confidence_level)
+        for t in range(n):
+            thresholds[t] = -stats.std * z_score
+            stats.update(values[window + t])
+    else:
+        raise ValueError(f"Unknown VaR method: {method}")
+
+    realized = values[window:]
+    frame = pd.DataFrame(
+        {
+            "Return": realized,
+            "VaR": -thresholds * portfolio_value,
+            "Threshold": thresholds,
+            "Exception": realized < thresholds,
+        },
+        index=returns.index[window:],
+    )
+    return frame, var_coverage_tests(frame["Exception"].to_numpy(), confidence_level)
+
+
+def backtest_var_portfolio(
+    df_portfolio,
+    weights,
+    portfolio_value=100000,
+    confidence_level=0.95,
+    window=250,
+    method="historical",
+):
+    """
+    backtest_var on the weighted portfolio return series.
+    """
+    return backtest_var(
+        df_portfolio.dot(np.array(weights)),
+        portfolio_value=portfolio_value,
+        confidence_level=confidence_level,
+        window=window,
+        method=method,
+    )
+
+
+def var_attribution(
+    df_portfolio,
+    weights,
+    portfolio_value=100000,
+    confidence_level=0.95,
+    day=1,
+    annualization_factor=252,
+    horizon_index=None,
+):
+    """
+    Per-position VaR attribution for a weighted portfolio.
+
+    Parametric columns come from one covariance-weights product: marginal
+    VaR (dVaR/dw_i, in dollars per unit weight), component VaR (w_i times
+    marginal; they sum to parametric_var_portfolio) and incremental VaR
+    (drop in VaR when the position is removed, exact for every position
+    at once). Historical columns split historical_var_portfolio across the
+    scenarios at the VaR quantile and the Expected Shortfall across all
+    tail scenarios; both sum to the portfolio totals.
+    """
+    tickers = list(df_portfolio.columns)
+    weights = np.array(weights, dtype=float)
+    _, covariance_matrix = portfolio_moments(df_portfolio, annualization_factor)
+    daily_covariance = covariance_matrix / annualization_factor
+
+    sigma_w = daily_covariance @ weights
+    variance = float(weights @ sigma_w)
+    volatility = np.sqrt(variance)
+    scale = portfolio_value * norm.ppf(confidence_level) * np.sqrt(day)
+    marginal = scale * sigma_w / volatility if volatility > 0 else np.zeros_like(weights)
+    component = weights * marginal
+    # Portfolio variance without position i, for every i in one step.
+    variance_without = (
+        variance - 2 * weights * sigma_w + weights**2 * np.diag(daily_covariance)
+    )
+    incremental = scale * (volatility - np.sqrt(np.maximum(variance_without, 0.0)))
+
+    # Historical: asset horizon returns on the days where all assets trade.
+    asset_returns = _horizon_index(df_portfolio, horizon_index).horizon_returns(day)
+    scenario_returns = asset_returns @ weights
+    order = np.argsort(scenario_returns)
+    position = (1 - confidence_level) * (len(order) - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(order) - 1)
+    fraction = position - lower
+    # Same interpolation as np.percentile, applied to each asset's share.
+    quantile_contribution = (
+        asset_returns[order[lower]] * (1 - fraction) + asset_returns[order[upper]] * fraction
+    ) * weights
+    cutoff = quantile_contribution.sum()
+    sign = -1.0 if cutoff <= 0 else 1.0
+    tail = scenario_returns <= cutoff
+    if not tail.any():
+        tail[order[0]] = True
+    tail_contribution = asset_returns[tail].mean(axis=0) * weights
+
+    attribution = pd.DataFrame(
+        {
+            "Weight": weights,
+            "Marginal VaR": marginal,
+            "Component VaR": component,
+            "Component VaR %": component / component.sum() if component.sum() else np.nan,
+            "Incremental VaR": incremental,
+            "Historical Component VaR": sign * portfolio_value * quantile_contribution,
+            "Historical Component ES": -portfolio_value * tail_contribution,
+        },
+        index=pd.Index(tickers, name="Ticker"),
+    )
+    return attribution
+
+
+VAR_SURFACE_CONFIDENCES = (0.90, 0.95, 0.975, 0.99, 0.995, 0.999)
+VAR_SURFACE_HORIZONS = (1, 5, 10, 20)
+
+
+def _sorted_percentiles(sorted_values, probabilities):
+    """
+    np.percentile (linear interpolation) for many probabilities at once,
+    read from an already sorted array.
+    """
+    position = np.asarray(probabilities) * (len(sorted_values) - 1)
+    lower = np.floor(position).astype(np.intp)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def var_surface(
+    returns,
+    daily_volatility,
+    portfolio_value=100000,
+    confidence_levels=VAR_SURFACE_CONFIDENCES,
+    horizons=VAR_SURFACE_HORIZONS,
+):
+    """
+    Parametric and historical VaR and Expected Shortfall for every
+    (confidence level, horizon) pair in one pass.
+
+    Each horizon's overlapping return series is sorted once and every
+    quantile and tail mean is read from it. returns may also be a
+    HorizonReturnIndex. Returns a frame indexed by
+    (measure, confidence) with one column per horizon in days.
+    """
+    if isinstance(returns, HorizonReturnIndex):
+        # A one-column panel index (e.g. get_horizon_index([ticker])) reads
+        # as its single series.
+        horizon_index = returns.portfolio([1.0]) if returns.is_panel else returns
+    else:
+        horizon_index = HorizonReturnIndex(returns)
+    confidence_levels = np.asarray(confidence_levels, dtype=float)
+    z_scores = norm.ppf(confidence_levels)
+    # Standard normal tail mean beyond z, as a multiple of sigma.
+    es_multipliers = norm.pdf(z_scores) / (1 - confidence_levels)
+
+    surface = {}
+    for day in horizons:
+        scale = portfolio_value * daily_volatility * np.sqrt(day)
+        sorted_returns = np.sort(horizon_index.horizon_returns(day))
+        if len(sorted_returns) == 0:
+            historical_var = historical_es = np.full(len(confidence_levels), np.nan)
+        else:
+            cutoffs = _sorted_percentiles(sorted_returns, 1 - confidence_levels)
+            tail_sums = np.cumsum(sorted_returns)
+            tail_counts = np.maximum(
+                np.searchsorted(sorted_returns, cutoffs, side="right"), 1
+            )
+            historical_var = portfolio_value * np.abs(cutoffs)
+            historical_es = portfolio_value * np.abs(
+                tail_sums[tail_counts - 1] / tail_counts
+            )
+        surface[day] = np.concatenate(
+            [scale * z_scores, scale * es_multipliers, historical_var, historical_es]
+        )
+
+    index = pd.MultiIndex.from_product(
+        [
+            ["Parametric VaR", "Parametric ES", "Historical VaR", "Historical ES"],
+            confidence_levels,
+        ],
+        names=["measure", "confidence"],
+    )
+    return pd.DataFrame(surface, index=index).rename_axis(columns="horizon")
+
+
+def var_surface_portfolio(
+    df_portfolio,
+    weights,
+    portfolio_value=100000,
+    confidence_levels=VAR_SURFACE_CONFIDENCES,
+    horizons=VAR_SURFACE_HORIZONS,
+    annualization_factor=252,
+    horizon_index=None,
+):
+    """
+    var_surface for a weighted portfolio; entries match
+    parametric_var_portfolio and historical_var_portfolio.
+    """
+    weights = np.array(weights)
+    portfolio_volatility = portfolio_performance_with_data(
+        df_portfolio, weights, annualization_factor=annualization_factor
+    )[1]
+    return var_surface(
+        _horizon_index(df_portfolio, horizon_index).portfolio(weights),
+        portfolio_volatility / np.sqrt(annualization_factor),
+        portfolio_value=portfolio_value,
+        confidence_levels=confidence_levels,
+        horizons=horizons,
+    )
+
+
+def var_surface_ticker(
+    df,
+    portfolio_value=100000,
+    confidence_levels=VAR_SURFACE_CONFIDENCES,
+    horizons=VAR_SURFACE_HORIZONS,
+    annualization_factor=252,
+    horizon_index=None,
+):
+    """
+    var_surface for one ticker; entries match calculate_parametric_var
+    (current 21-day volatility) and calculate_historical_var.
+    """
+    if "Volatility" in df:
+        annual_volatility = df["Volatility"].iloc[-1]
+    else:
+        annual_volatility = rolling_volatility(df, annualization_factor).iloc[-1]
+    return var_surface(
+        _horizon_index(df["Log_Return"], horizon_index),
+        annual_volatility / np.sqrt(annualization_factor),
+        portfolio_value=portfolio_value,
+        confidence_levels=confidence_levels,
+        horizons=horizons,
+    )
+
+
+def covariance_factor(covariance_matrix):
+    """
+    Matrix L with L @ L.T == covariance_matrix: Cholesky when it is positive
+    definite, otherwise an eigen-decomposition with negative eigenvalues
+    clipped to zero (e.g. for collinear or very short histories).
+    """
+    covariance_matrix = np.asarray(covariance_matrix, dtype=float)
+    try:
+        return np.linalg.cholesky(covariance_matrix)
+    except np.linalg.LinAlgError:
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance_matrix)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+
+def _bounded_map(pool, function, tasks, max_in_flight):
+    """
+    Like pool.map over argument tuples, but with at most max_in_flight tasks
+    submitted at a time, so finished chunks cannot pile up in memory.
+    Yields results in task order.
+    """
+    pending = collections.deque()
+    for task in tasks:
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+        pending.append(pool.submit(function, *task))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _merge_largest(current, new, k):
+    """
+    The k largest values of two arrays combined (unsorted).
+    """
+    values = np.concatenate([current, new])
+    if len(values) <= k:
+        return values
+    return np.partition(values, len(values) - k)[-k:]
+
+
+def monte_carlo_var_portfolio(
+    df_portfolio,
+    weights,
+    portfolio_value=100000,
+    confidence_levels=(0.95, 0.99),
+    day=1,
+    simulations=1_000_000,
+    chunk_size=None,
+    seed=None,
+    workers=None,
+):
+    """
+    Monte Carlo VaR and Expected Shortfall from correlated per-asset returns.
+
+    Daily mean and covariance come from the returns panel; each scenario
+    draws day-horizon asset log returns through the covariance factor and
+    fully revalues the positions. Scenarios run in chunks of about 2M
+    random numbers (sized by the number of assets), each with its own RNG
+    stream spawned from `seed`, on a thread pool with at most `workers`
+    chunks in flight (default min(4, CPUs)); only the worst-loss tail
+    needed for the requested confidence levels is kept, so memory does not
+    grow with the number of scenarios or cores. Results for a given seed
+    do not depend on the number of workers.
+    """
+    weights = np.array(weights, dtype=float)
+    if chunk_size is None:
+        chunk_size = max(1, 2_000_000 // len(weights))
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    mean = df_portfolio.mean().to_numpy() * day
+    factor = covariance_factor(df_portfolio.cov().to_numpy() * day)
+    confidence_levels = tuple(confidence_levels)
+
+    # np.percentile position of the lowest requested confidence level,
+    # counted from the largest loss, bounds how much of the tail to keep.
+    positions = {c: c * (simulations - 1) for c in confidence_levels}
+    tail_size = simulations - int(np.floor(min(positions.values())))
+
+    chunk_sizes = [
+        min(chunk_size, simulations - start) for start in range(0, simulations, chunk_size)
+    ]
+    streams = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    def run_chunk(size, stream):
+        rng = np.random.default_rng(stream)
+        asset_returns = rng.standard_normal((size, len(weights))) @ factor.T
+        asset_returns += mean
+        np.expm1(asset_returns, out=asset_returns)
+        losses = -portfolio_value * (asset_returns @ weights)
+        return losses.sum(), (losses**2).sum(), _merge_largest(losses[:0], losses, tail_size)
+
+    total = total_sq = 0.0
+    tail = np.empty(0)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk_sum, chunk_sq, chunk_tail in _bounded_map(
+            pool, run_chunk, zip(chunk_sizes, streams), workers
+        ):
+            total += chunk_sum
+            total_sq += chunk_sq
+            tail = _merge_largest(tail, chunk_tail, tail_size)
+
+    tail = np.sort(tail)[::-1]
+    var = {}
+    es = {}
+    for c, position in positions.items():
+        # tail[i] is the (simulations - 1 - i)-th smallest loss.
+        lower = int(np.floor(position))
+        upper = min(lower + 1, simulations - 1)
+        low_value = tail[simulations - 1 - lower]
+        high_value = tail[simulations - 1 - upper]
+        var[c] = float(low_value + (high_value - low_value) * (position - lower))
+        es[c] = float(tail[tail >= var[c]].mean())
+
+    expected_loss = total / simulations
+    return {
+        "var": var,
+        "es": es,
+        "expected_pnl": float(-expected_loss),
+        "pnl_volatility": float(np.sqrt(max(total_sq / simulations - expected_loss**2, 0.0))),
+        "simulations": simulations,
+        "day": day,
+    }
+
+
+def geometric_brownian_motion(
+    df_portfolio, weights, start_value=100000, days=252, simulations=500
+):
+    """
+    Geometric Brownian Motion kullanarak portföy simülasyonu yapar.
+    """
+    weights = np.array(weights)
+    portfolio_daily_returns = df_portfolio.dot(weights)
+    mu_p = portfolio_daily_returns.mean()  # Portföyün Günlük Drift'i
+    sigma_p = portfolio_daily_returns.std()  # Portföyün Günlük Volatilitesi
+
+    # Monte Carlo Motoru
+    random_shocks = np.random.normal(0, 1, (simulations, days))
+    drift_component = mu_p - 0.5 * sigma_p**2
+    shock_component = sigma_p * random_shocks
+    daily_log_returns = drift_component + shock_component
+
+    portfolio_paths = np.zeros((simulations, days + 1))
+    portfolio_paths[:, 0] = start_value
+    portfolio_paths[:, 1:] = start_value * np.exp(np.cumsum(daily_log_returns, axis=1))
+
+    return portfolio_paths
+
+
+FAN_CHART_QUANTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def summarize_paths(paths, quantiles=FAN_CHART_QUANTILES, sample_paths=50):
+    """
+    Reduce a (simulations, days + 1) path matrix to what the fan chart needs:
+    per-day quantile bands, the mean path and a few sample paths packed into
+    one NaN-separated line.
+    """
+    bands = np.percentile(paths, quantiles, axis=0)
+    samples = paths[: min(sample_paths, len(paths))]
+    days = paths.shape[1]
+    sample_x = np.tile(np.append(np.arange(days, dtype=float), np.nan), len(samples))
+    sample_y = np.hstack([samples, np.full((len(samples), 1), np.nan)]).ravel()
+    return {
+        "quantiles": {q: bands[i] for i, q in enumerate(quantiles)},
+        "mean": paths.mean(axis=0),
+        "sample_x": sample_x,
+        "sample_y": sample_y,
+        "simulations": len(paths),
+    }
+
+
+def simulate_gbm_fan(
+    df_portfolio,
+    weights,
+    start_value=100000,
+    days=252,
+    simulations=500,
+    quantiles=FAN_CHART_QUANTILES,
+    sample_paths=50,
+):
+    """
+    Run geometric_brownian_motion and return only its summarize_paths
+    output, so callers never hold the full path matrix.
+    """
+    paths = geometric_brownian_motion(df_portfolio, weights, start_value, days, simulations)
+    return summarize_paths(paths, quantiles=quantiles, sample_paths=sample_paths)
+
+
+class HistogramQuantileSketch:
+    """
+    Mergeable quantile sketch for many series at once: a fixed grid of
+    `bins` equal-width bins per series between `lower` and `upper`, with
+    values outside the grid counted in the edge bins. Updates are one
+    bincount, merging is adding counts, and quantiles are read by linear
+    interpolation inside the bin, so the error is bounded by one bin width.
+    """
 
-    for symbol in symbols:
-        data = get_stock_data(symbol, period=period)
-        portfolio_df[symbol] = data["Log_Return"]
+    def __init__(self, lower, upper, bins=2048):
+        self.lower = np.asarray(lower, dtype=float)
+        self.upper = np.asarray(upper, dtype=float)
+        self.bins = bins
+        self.width = (self.upper - self.lower) / bins
+        self.counts = np.zeros((len(self.lower), bins), dtype=np.int64)
 
-    return portfolio_df
+    @property
+    def count(self):
+        return int(self.counts[0].sum()) if len(self.counts) else 0
 
+    def update(self, values):
+        """
+        Add a (n, series) block of observations.
+        """
+        positions = values - self.lower
+        positions /= self.width
+        np.clip(positions, 0, self.bins - 1, out=positions)
+        flat = positions.astype(np.intp)
+        flat += np.arange(len(self.lower)) * self.bins
+        self.counts += np.bincount(
+            flat.ravel(), minlength=self.counts.size
+        ).reshape(self.counts.shape)
 
-def portfolio_performance_with_data(portfolio_df, weights, period="1y", annualization_factor=252):
-    expected_returns = portfolio_df.mean() * annualization_factor
-    covariance_matrix = portfolio_df.cov() * annualization_factor
-    weights = np.array(weights)
-    portfolio_return = np.sum(expected_returns * weights)
-    portfolio_volatility = np.sqrt(
-        np.dot(weights.T, np.dot(covariance_matrix, weights))
-    )
-    return portfolio_return, portfolio_volatility
+    def merge(self, other):
+        """
+        Fold another sketch built on the same grid into this one.
+        """
+        self.counts += other.counts
+        return self
 
+    def quantiles(self, probabilities):
+        """
+        Array of shape (len(probabilities), series).
+        """
+        cumulative = np.cumsum(self.counts, axis=1)
+        rows = np.arange(len(self.lower))
+        result = []
+        for probability in np.atleast_1d(probabilities):
+            target = probability * cumulative[:, -1]
+            position = np.minimum(
+                (cumulative < target[:, None]).sum(axis=1), self.bins - 1
+            )
+            before = np.where(position > 0, cumulative[rows, position - 1], 0)
+            in_bin = np.maximum(self.counts[rows, position], 1)
+            fraction = np.clip((target - before) / in_bin, 0.0, 1.0)
+            result.append(self.lower + (position + fraction) * self.width)
+        return np.array(result)
 
-def calculate_parametric_var(df, portfolio_value=100000, confidence_level=0.95, day=1, annualization_factor=252):
+    def histogram(self, series=-1):
+        """
+        Bin edges and counts of one series (the last one by default).
+        """
+        edges = self.lower[series] + np.arange(self.bins + 1) * self.width[series]
+        return edges, self.counts[series]
+
+
+def simulate_gbm_streaming(
+    df_portfolio,
+    weights,
+    start_value=100000,
+    days=252,
+    simulations=1_000_000,
+    quantiles=FAN_CHART_QUANTILES,
+    sample_paths=50,
+    chunk_size=10_000,
+    seed=None,
+    bins=2048,
+    method="plain",
+    control_variate=False,
+    replicates=8,
+):
     """
-    Hull'un 'Linear Model'ini (Parametrik VaR) kullanarak riski hesaplar.
+    Same model and summary as simulate_gbm_fan, in constant memory.
+
+    Paths are generated chunk by chunk and folded into a per-day running
+    mean and a HistogramQuantileSketch of log values whose grid spans
+    +/- 8 standard deviations of each day's analytic distribution. The
+    summary also carries the terminal-value histogram and standard errors;
+    see simulate_multi_asset_gbm for `method`, `control_variate` and
+    `replicates` (this is its one-asset case, run in-process).
     """
+    portfolio_daily_returns = df_portfolio.dot(np.array(weights))
+    return _simulate_gbm_summary(
+        np.array([portfolio_daily_returns.mean()]),
+        np.array([[portfolio_daily_returns.var()]]),
+        np.ones(1),
+        start_value=start_value,
+        days=days,
+        simulations=simulations,
+        rebalance=None,
+        quantiles=quantiles,
+        sample_paths=sample_paths,
+        chunk_size=chunk_size,
+        seed=seed,
+        workers=1,
+        bins=bins,
+        method=method,
+        control_variate=control_variate,
+        replicates=replicates,
+    )
 
-    current_annual_volatility = df["Volatility"].iloc[-1]
 
-    daily_volatility = current_annual_volatility / np.sqrt(annualization_factor)
+GBM_METHODS = ("plain", "antithetic", "sobol")
 
-    z_score = norm.ppf(confidence_level)
 
-    var_value = portfolio_value * daily_volatility * z_score * np.sqrt(day)
+@functools.lru_cache(maxsize=16)
+def _brownian_bridge_plan(steps):
+    """
+    Fill order for a Brownian bridge on steps unit intervals: (point, left,
+    right, left weight, right weight, conditional sd) rows, coarsest first.
+    """
+    plan = []
+    intervals = collections.deque([(0, steps)])
+    while intervals:
+        left, right = intervals.popleft()
+        if right - left < 2:
+            continue
+        middle = (left + right) // 2
+        plan.append(
+            (
+                middle,
+                left,
+                right,
+                (right - middle) / (right - left),
+                (middle - left) / (right - left),
+                np.sqrt((middle - left) * (right - middle) / (right - left)),
+            )
+        )
+        intervals.extend([(left, middle), (middle, right)])
+    return tuple(plan)
 
-    return var_value, current_annual_volatility
+
+def _brownian_bridge(normals):
+    """
+    Turn (n, steps) standard normals into (n, steps) Brownian increments.
+    Column 0 sets the endpoint and later columns refine the path by
+    bisection, so a quasi-random sequence's best coordinates drive the
+    largest-scale moves.
+    """
+    steps = normals.shape[1]
+    path = np.zeros((len(normals), steps + 1))
+    path[:, steps] = np.sqrt(steps) * normals[:, 0]
+    for column, (middle, left, right, left_weight, right_weight, sd) in enumerate(
+        _brownian_bridge_plan(steps), start=1
+    ):
+        path[:, middle] = (
+            left_weight * path[:, left] + right_weight * path[:, right] + sd * normals[:, column]
+        )
+    return np.diff(path, axis=1)
 
 
-def calculate_historical_var(df, portfolio_value=100000, confidence_level=0.95, day=1):
+def _gbm_shocks(method, stream, offset, size, days, assets):
     """
-    Tarihsel Simülasyon yöntemi ile VaR hesaplar.
+    (size, days, assets) standard normal shocks for one chunk.
     """
+    if method == "sobol":
+        # Every chunk of a replicate reads its own slice of one scrambled
+        # sequence, seeded by the replicate's stream.
+        engine = qmc.Sobol(days * assets, scramble=True, seed=np.random.default_rng(stream))
+        if offset:
+            engine.fast_forward(offset)
+        uniforms = np.clip(engine.random(size), 2**-53, 1 - 2**-53)
+        normals = norm.ppf(uniforms).reshape(size, days, assets).transpose(0, 2, 1)
+        increments = _brownian_bridge(normals.reshape(size * assets, days))
+        return increments.reshape(size, assets, days).transpose(0, 2, 1)
+    rng = np.random.default_rng(stream)
+    if method == "antithetic":
+        half = rng.standard_normal(((size + 1) // 2, days, assets))
+        return np.concatenate([half, -half])[:size]
+    return rng.standard_normal((size, days, assets))
 
-    # 1. Eğer vade 1 günden fazlaysa, geçmişteki o vadeli getirileri oluştur
-    if day == 1:
-        # 1 günse olduğu gibi al
-        period_returns = df["Log_Return"].dropna()
-    else:
-        period_returns = df["Log_Return"].rolling(window=day).sum().dropna()
 
-    # VaR yüzdesini hesapla
-    var_percentile = np.percentile(period_returns, (1 - confidence_level) * 100)
+# One process pool per worker count, reused across runs. Workers start
+# from a forkserver (spawn where that is unavailable, e.g. Windows) rather
+# than fork(), which is unsafe in the threaded Streamlit server (and while
+# the warm-up thread is running).
+_simulation_pools = {}
+_simulation_pools_lock = threading.Lock()
 
-    var_value = portfolio_value * abs(var_percentile)
 
-    return var_value
+def _simulation_pool(workers):
+    with _simulation_pools_lock:
+        pool = _simulation_pools.get(workers)
+        if pool is None or getattr(pool, "_broken", False):
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+            else:
+                context = multiprocessing.get_context("spawn")
+            pool = _simulation_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context
+            )
+        return pool
 
 
-def parametric_var_portfolio(
-    df_portfolio, weights, portfolio_value=100000, confidence_level=0.95, day=1, annualization_factor=252
+def _gbm_chunk(task):
+    """
+    One chunk of simulated portfolio growth paths from correlated per-asset
+    log returns, folded into sketch counts, running sums and the first few
+    paths. Top-level so a process pool can run it.
+    """
+    weights = task["weights"]
+    lower = task["lower"]
+    days = len(lower)
+    size = task["size"]
+    rebalance = task["rebalance"]
+    shocks = _gbm_shocks(
+        task["method"], task["stream"], task["offset"], size, days, len(weights)
+    )
+    cumulative = shocks @ task["factor"].T
+    del shocks
+    cumulative += task["drift"]
+    np.cumsum(cumulative, axis=1, out=cumulative)
+    control = np.exp(cumulative @ weights) if task["control_variate"] else None
+
+    block_ids = np.arange(days) // rebalance
+    if rebalance < days:
+        # Restart every asset's growth at each rebalance date.
+        block_ends = cumulative[:, rebalance - 1 :: rebalance]
+        starts = np.concatenate([np.zeros_like(block_ends[:, :1]), block_ends], axis=1)
+        cumulative -= starts[:, block_ids]
+    np.exp(cumulative, out=cumulative)
+    growth = cumulative @ weights
+    del cumulative
+    if rebalance < days:
+        # Compound the portfolio value carried into each block.
+        block_growth = growth[:, rebalance - 1 :: rebalance]
+        carried = np.concatenate(
+            [np.ones((size, 1)), np.cumprod(block_growth, axis=1)], axis=1
+        )
+        growth *= carried[:, block_ids]
+
+    sketch = HistogramQuantileSketch(lower, task["upper"], task["bins"])
+    sketch.update(np.log(np.maximum(growth, 1e-300)))
+    sums = {"growth": growth.sum(axis=0)}
+    if control is not None:
+        sums["control"] = control.sum(axis=0)
+        sums["cross"] = np.einsum("ij,ij->j", growth, control)
+        sums["control_sq"] = np.einsum("ij,ij->j", control, control)
+    return task["replicate"], sketch.counts, sums, growth[: task["sample_paths"]].copy()
+
+
+def _simulate_gbm_summary(
+    mean,
+    covariance_matrix,
+    weights,
+    start_value,
+    days,
+    simulations,
+    rebalance,
+    quantiles,
+    sample_paths,
+    chunk_size,
+    seed,
+    workers,
+    bins,
+    method,
+    control_variate,
+    replicates,
 ):
     """
-    Portföy için Hull'un 'Linear Model'ini (Parametrik VaR) kullanarak riski hesaplar.
+    Shared engine of simulate_gbm_streaming and simulate_multi_asset_gbm.
     """
-    weights = np.array(weights)
+    if method not in GBM_METHODS:
+        raise ValueError(f"method must be one of {GBM_METHODS}, got {method!r}")
+    weights = np.asarray(weights, dtype=float)
+    factor = covariance_factor(covariance_matrix)
+    drift = mean - 0.5 * np.diag(covariance_matrix)
+    rebalance = days if not rebalance else min(int(rebalance), days)
+    if method == "sobol" and days * len(weights) > qmc.Sobol.MAXDIM:
+        raise ValueError(
+            f"Sobol sampling supports at most {qmc.Sobol.MAXDIM} days x assets"
+        )
 
-    portfolio_volatility = portfolio_performance_with_data(df_portfolio, weights, annualization_factor=annualization_factor)[1]
+    # Long-only portfolio log growth stays between the extreme assets'.
+    steps = np.arange(1, days + 1)
+    spread = 8 * np.sqrt(np.diag(covariance_matrix).max() * steps) + 1e-12
+    lower = drift.min() * steps - spread
+    upper = drift.max() * steps + spread
 
-    daily_volatility = portfolio_volatility / np.sqrt(annualization_factor)
+    # Equal-size replicates: even for antithetic pairs, a power of two
+    # for Sobol balance.
+    per_replicate = -(-simulations // replicates)
+    if method == "antithetic":
+        per_replicate += per_replicate % 2
+        chunk_size += chunk_size % 2
+    elif method == "sobol":
+        per_replicate = 1 << (per_replicate - 1).bit_length()
+        chunk_size = 1 << (chunk_size.bit_length() - 1)
+    chunk_size = min(chunk_size, per_replicate)
 
-    z_score = norm.ppf(confidence_level)
+    tasks = []
+    for replicate, replicate_stream in enumerate(
+        np.random.SeedSequence(seed).spawn(replicates)
+    ):
+        offsets = range(0, per_replicate, chunk_size)
+        streams = (
+            [replicate_stream] * len(offsets)
+            if method == "sobol"
+            else replicate_stream.spawn(len(offsets))
+        )
+        for offset, stream in zip(offsets, streams):
+            tasks.append(
+                {
+                    "replicate": replicate,
+                    "size": min(chunk_size, per_replicate - offset),
+                    "offset": offset,
+                    "stream": stream,
+                    "method": method,
+                    "drift": drift,
+                    "factor": factor,
+                    "weights": weights,
+                    "rebalance": rebalance,
+                    "lower": lower,
+                    "upper": upper,
+                    "bins": bins,
+                    "sample_paths": sample_paths,
+                    "control_variate": control_variate,
+                }
+            )
 
-    var_value = portfolio_value * daily_volatility * z_score * np.sqrt(day)
+    sketches = [HistogramQuantileSketch(lower, upper, bins) for _ in range(replicates)]
+    sums = [collections.defaultdict(float) for _ in range(replicates)]
+    samples = []
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    if workers == 1 or len(tasks) == 1:
+        results = map(_gbm_chunk, tasks)
+    else:
+        results = _bounded_map(
+            _simulation_pool(workers), _gbm_chunk, ((task,) for task in tasks), 2 * workers
+        )
+    for replicate, counts, chunk_sums, chunk_samples in results:
+        sketches[replicate].counts += counts
+        for key, value in chunk_sums.items():
+            sums[replicate][key] = sums[replicate][key] + value
+        if sum(map(len, samples)) < sample_paths:
+            samples.append(chunk_samples)
 
-    return var_value, portfolio_volatility
+    growth_means = np.array([s["growth"] for s in sums]) / per_replicate
+    if control_variate:
+        # The control exp(w . X_t) has an analytic lognormal mean; one
+        # pooled coefficient per day, applied inside every replicate.
+        expected_control = np.exp(
+            steps * (weights @ drift + 0.5 * weights @ covariance_matrix @ weights)
+        )
+        control_means = np.array([s["control"] for s in sums]) / per_replicate
+        pooled_growth = growth_means.mean(axis=0)
+        pooled_control = control_means.mean(axis=0)
+        covariance = np.mean([s["cross"] for s in sums], axis=0) / per_replicate
+        covariance -= pooled_growth * pooled_control
+        variance = np.mean([s["control_sq"] for s in sums], axis=0) / per_replicate
+        variance -= pooled_control**2
+        beta = np.divide(
+            covariance, variance, out=np.zeros_like(variance), where=variance > 0
+        )
+        growth_means = growth_means - beta * (control_means - expected_control)
+
+    probabilities = np.asarray(quantiles) / 100
+    replicate_bands = start_value * np.exp(
+        np.array([sketch.quantiles(probabilities) for sketch in sketches])
+    )
+    combined = HistogramQuantileSketch(lower, upper, bins)
+    for sketch in sketches:
+        combined.merge(sketch)
+    bands = start_value * np.exp(combined.quantiles(probabilities))
+    mean_path = start_value * growth_means.mean(axis=0)
+    if replicates > 1:
+        mean_error = start_value * growth_means.std(axis=0, ddof=1) / np.sqrt(replicates)
+        band_errors = replicate_bands.std(axis=0, ddof=1) / np.sqrt(replicates)
+    else:
+        mean_error = np.full(days, np.nan)
+        band_errors = np.full((len(quantiles), days), np.nan)
+
+    samples = np.vstack(samples) if samples else np.empty((0, days))
+    samples = start_value * samples[:sample_paths]
+    samples = np.hstack([np.full((len(samples), 1), float(start_value)), samples])
+    edges, counts = combined.histogram()
+    sample_x = np.tile(np.append(np.arange(days + 1, dtype=float), np.nan), len(samples))
+    sample_y = np.hstack([samples, np.full((len(samples), 1), np.nan)]).ravel()
+    start = [float(start_value)]
+    return {
+        "quantiles": {
+            q: np.concatenate([start, bands[i]]) for i, q in enumerate(quantiles)
+        },
+        "mean": np.concatenate([start, mean_path]),
+        "standard_errors": {
+            "mean": np.concatenate([[0.0], mean_error]),
+            **{q: np.concatenate([[0.0], band_errors[i]]) for i, q in enumerate(quantiles)},
+        },
+        "sample_x": sample_x,
+        "sample_y": sample_y,
+        "simulations": per_replicate * replicates,
+        "method": method,
+        "control_variate": control_variate,
+        "terminal_histogram": (start_value * np.exp(edges), counts),
+    }
 
 
-def historical_var_portfolio(
-    df_portfolio, weights, portfolio_value=100000, confidence_level=0.95, day=1
+def simulate_multi_asset_gbm(
+    df_portfolio,
+    weights,
+    start_value=100000,
+    days=252,
+    simulations=10_000,
+    rebalance=None,
+    quantiles=FAN_CHART_QUANTILES,
+    sample_paths=50,
+    chunk_size=None,
+    seed=None,
+    workers=None,
+    bins=2048,
+    method="plain",
+    control_variate=False,
+    replicates=8,
 ):
     """
-    Portföy için 'Historical Simulation' (Gerçek Veri) VaR hesabı.
-    Ağırlıklandırılmış geçmiş getirileri kullanır.
+    GBM simulation of every constituent instead of the blended portfolio
+    series: correlated daily log returns come from the covariance factor of
+    the returns panel, with the same per-asset drift convention as
+    geometric_brownian_motion.
+
+    `rebalance` is the number of trading days between resets to the target
+    weights (None for buy-and-hold). Chunks draw from RNG streams spawned
+    from `seed` and run on a process pool; chunking depends only on the
+    problem size, so results for a given seed are bit-identical for any
+    number of workers. Returns the simulate_gbm_streaming summary.
+
+    Variance reduction: `method` is "plain", "antithetic" (each draw is
+    paired with its negation) or "sobol" (scrambled Sobol points mapped to
+    paths with a Brownian bridge). `control_variate` corrects the mean
+    path with exp(w . X_t), whose expectation is analytic. Paths are split
+    into `replicates` independent groups (separate scrambles for Sobol)
+    and the spread of their estimates gives the standard error of the mean
+    and of every quantile band. `simulations` is rounded up so every
+    replicate has the same size (a power of two for Sobol).
     """
-    weights = np.array(weights)
+    weights = np.array(weights, dtype=float)
+    if chunk_size is None:
+        # About 2M random numbers (16 MB) per chunk.
+        chunk_size = max(1, 2_000_000 // (days * len(weights)))
+    return _simulate_gbm_summary(
+        df_portfolio.mean().to_numpy(),
+        df_portfolio.cov().to_numpy(),
+        weights,
+        start_value=start_value,
+        days=days,
+        simulations=simulations,
+        rebalance=rebalance,
+        quantiles=quantiles,
+        sample_paths=sample_paths,
+        chunk_size=chunk_size,
+        seed=seed,
+        workers=workers,
+        bins=bins,
+        method=method,
+        control_variate=control_variate,
+        replicates=replicates,
+    )
+
 
-    portfolio_historical_returns = df_portfolio.dot(weights)
-    portfolio_historical_returns = portfolio_historical_returns.dropna()
-    # 2. ADIM: Rolling Sum (Doğru Historical Yöntem)
-    if day > 1:
-        portfolio_historical_returns = (
-            portfolio_historical_returns.rolling(window=day).sum().dropna()
+def gbm_fan_chart(summary, title=None):
+    """
+    Fan chart from summarize_paths output. The figure size depends only on
+    the horizon and the number of bands, not on the number of simulations.
+    """
+    bands = summary["quantiles"]
+    days = np.arange(len(summary["mean"]))
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=summary["sample_x"],
+            y=summary["sample_y"],
+            mode="lines",
+            name="Sample Paths",
+            line=dict(color="rgba(50, 0, 220, 0.1)", width=1),
+            connectgaps=False,
+            hoverinfo="skip",
         )
+    )
 
-    # 3. ADIM: Percentile
-    var_percentile = np.percentile(
-        portfolio_historical_returns, (1 - confidence_level) * 100
+    levels = sorted(bands)
+    for low, high in zip(levels, reversed(levels)):
+        if low >= high:
+            break
+        fig.add_trace(
+            go.Scatter(
+                x=days,
+                y=bands[low],
+                mode="lines",
+                line=dict(width=0),
+                showlegend=False,
+                hoverinfo="skip",
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=days,
+                y=bands[high],
+                mode="lines",
+                fill="tonexty",
+                fillcolor="rgba(50, 0, 220, 0.12)",
+                line=dict(width=0),
+                name=f"{low}th-{high}th Percentile",
+            )
+        )
+
+    if 50 in bands:
+        fig.add_trace(
+            go.Scatter(
+                x=days,
+                y=bands[50],
+                mode="lines",
+                name="Median",
+                line=dict(color="green", dash="dash"),
+            )
+        )
+    fig.add_trace(
+        go.Scatter(
+            x=days,
+            y=summary["mean"],
+            mode="lines",
+            name="Expected Value (Mean)",
+            line=dict(color="red", width=3),
+        )
+    )
+    fig.update_layout(
+        title=title or f"GBM Simulation ({summary['simulations']} Scenarios)",
+        xaxis_title="Trading Day",
+        yaxis_title="Portfolio Value ($)",
+        hovermode="x",
     )
+    return fig
 
-    return portfolio_value * abs(var_percentile)
+
+def portfolio_moments(portfolio_df, annualization_factor=252):
+    """
+    Annualized expected returns and covariance matrix as numpy arrays.
+    Estimated once so batch engines do not touch the return frame again.
+    annualization_factor may be a scalar or one factor per column.
+    """
+    annualization_factor = np.asarray(annualization_factor, dtype=float)
+    expected_returns = portfolio_df.mean().to_numpy() * annualization_factor
+    covariance_matrix = portfolio_df.cov().to_numpy()
+    if annualization_factor.ndim:
+        covariance_matrix = covariance_matrix * np.sqrt(
+            np.outer(annualization_factor, annualization_factor)
+        )
+    else:
+        covariance_matrix = covariance_matrix * annualization_factor
+    return expected_returns, covariance_matrix
 
 
-def geometric_brownian_motion(
-    df_portfolio, weights, start_value=100000, days=252, simulations=500
+def batch_portfolio_performance(expected_returns, covariance_matrix, weights_matrix):
+    """
+    Return and volatility for every row of a (P x N) weights matrix.
+    """
+    weights_matrix = np.asarray(weights_matrix, dtype=float)
+    portfolio_returns = weights_matrix @ expected_returns
+    portfolio_variances = np.einsum(
+        "ij,ij->i", weights_matrix @ covariance_matrix, weights_matrix
+    )
+    portfolio_volatilities = np.sqrt(np.maximum(portfolio_variances, 0.0))
+    return portfolio_returns, portfolio_volatilities
+
+
+def _skyline(x, y):
+    """
+    Indices of points not weakly dominated from the left or from the right
+    (higher y than every point with smaller x, or with larger x). Every
+    upper convex hull vertex is one of them.
+    """
+    order = np.lexsort((-y, x))
+    ordered = y[order]
+    from_left = ordered > np.concatenate([[-np.inf], np.maximum.accumulate(ordered)[:-1]])
+    reverse = np.lexsort((-y, -x))
+    backward = y[reverse]
+    from_right = backward > np.concatenate([[-np.inf], np.maximum.accumulate(backward)[:-1]])
+    return np.union1d(order[from_left], reverse[from_right])
+
+
+def upper_hull(x, y):
+    """
+    Indices of the upper convex hull of (x, y) points, by increasing x.
+    Candidates are first cut to the skyline, so the monotone chain only
+    walks a handful of points.
+    """
+    candidates = _skyline(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    candidates = candidates[np.lexsort((-y[candidates], x[candidates]))]
+    hull = []
+    for index in candidates:
+        while len(hull) >= 2:
+            a, b = hull[-2], hull[-1]
+            cross = (x[b] - x[a]) * (y[index] - y[a]) - (y[b] - y[a]) * (x[index] - x[a])
+            if cross < 0:
+                break
+            hull.pop()
+        if hull and x[hull[-1]] == x[index]:
+            continue
+        hull.append(index)
+    return np.array(hull, dtype=np.intp)
+
+
+def sample_frontier(
+    expected_returns,
+    covariance_matrix,
+    num_portfolios=10000,
+    seed=None,
+    risk_free_rate=0.0,
+    sampling="dirichlet",
+    chunk_size=100_000,
+    reservoir_size=MAX_SCATTER_POINTS,
 ):
     """
-    Geometric Brownian Motion kullanarak portföy simülasyonu yapar.
+    Random long-only portfolios evaluated chunk by chunk, keeping only a
+    constant-size summary: the best-Sharpe and minimum-volatility
+    portfolios, the upper convex hull of (volatility, return) with its
+    weights, and a uniform reservoir sample of points for plotting (the
+    reservoir_size smallest random keys seen so far).
+
+    sampling="dirichlet" draws uniformly on the simplex; "normalized"
+    divides uniform draws by their sum, which clusters near equal weight,
+    and reproduces the legacy np.random.seed stream for a given seed.
     """
-    weights = np.array(weights)
-    portfolio_daily_returns = df_portfolio.dot(weights)
-    mu_p = portfolio_daily_returns.mean()  # Portföyün Günlük Drift'i
-    sigma_p = portfolio_daily_returns.std()  # Portföyün Günlük Volatilitesi
+    n = len(expected_returns)
+    weights_stream, keys_stream = np.random.SeedSequence(seed).spawn(2)
+    if sampling == "normalized":
+        legacy = np.random.RandomState(seed)
+        draw = lambda size: legacy.random_sample((size, n))
+    elif sampling == "dirichlet":
+        generator = np.random.default_rng(weights_stream)
+        draw = lambda size: generator.standard_exponential((size, n))
+    else:
+        raise ValueError(f"sampling must be 'dirichlet' or 'normalized', got {sampling!r}")
+    keys_rng = np.random.default_rng(keys_stream)
+    # Keep each chunk's weight matrix near 4M numbers (32 MB).
+    chunk_size = max(1, min(chunk_size, 4_000_000 // n))
 
-    # Monte Carlo Motoru
-    random_shocks = np.random.normal(0, 1, (simulations, days))
-    drift_component = mu_p - 0.5 * sigma_p**2
-    shock_component = sigma_p * random_shocks
-    daily_log_returns = drift_component + shock_component
+    best = {"sharpe": (-np.inf, None, None, None), "vol": (np.inf, None, None, None)}
+    hull_vol = hull_ret = np.empty(0)
+    hull_weights = np.empty((0, n))
+    reservoir = {key: np.empty(0) for key in ("key", "vol", "ret", "sharpe")}
 
-    portfolio_paths = np.zeros((simulations, days + 1))
-    portfolio_paths[:, 0] = start_value
-    portfolio_paths[:, 1:] = start_value * np.exp(np.cumsum(daily_log_returns, axis=1))
+    for start in range(0, num_portfolios, chunk_size):
+        size = min(chunk_size, num_portfolios - start)
+        w = draw(size)
+        w /= w.sum(axis=1, keepdims=True)
+        ret, vol = batch_portfolio_performance(expected_returns, covariance_matrix, w)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(vol != 0, (ret - risk_free_rate) / vol, 0)
 
-    return portfolio_paths
+        idx = int(sharpe.argmax())
+        if sharpe[idx] > best["sharpe"][0]:
+            best["sharpe"] = (sharpe[idx], w[idx].copy(), ret[idx], vol[idx])
+        idx = int(vol.argmin())
+        if vol[idx] < best["vol"][0]:
+            best["vol"] = (vol[idx], w[idx].copy(), ret[idx], vol[idx])
+
+        candidates = _skyline(vol, ret)
+        all_vol = np.concatenate([hull_vol, vol[candidates]])
+        all_ret = np.concatenate([hull_ret, ret[candidates]])
+        all_weights = np.vstack([hull_weights, w[candidates]])
+        hull = upper_hull(all_vol, all_ret)
+        hull_vol, hull_ret, hull_weights = all_vol[hull], all_ret[hull], all_weights[hull]
+
+        keys = keys_rng.random(size)
+        merged = {
+            "key": np.concatenate([reservoir["key"], keys]),
+            "vol": np.concatenate([reservoir["vol"], vol]),
+            "ret": np.concatenate([reservoir["ret"], ret]),
+            "sharpe": np.concatenate([reservoir["sharpe"], sharpe]),
+        }
+        if len(merged["key"]) > reservoir_size:
+            keep = np.argpartition(merged["key"], reservoir_size)[:reservoir_size]
+            merged = {name: values[keep] for name, values in merged.items()}
+        reservoir = merged
+
+    return {
+        "max_sharpe": best["sharpe"],
+        "min_vol": best["vol"],
+        "hull": (hull_vol, hull_ret, hull_weights),
+        "reservoir": reservoir,
+        "num_portfolios": num_portfolios,
+    }
 
 
 def efficient_frontier_analysis_with_monte_carlo(
@@ -218,60 +2694,57 @@ def efficient_frontier_analysis_with_monte_carlo(
     seed=None,
     risk_free_rate: float = 0.0,
     annualization_factor=252,
+    chunk_size=100_000,
+    sampling="dirichlet",
 ):
-    if seed is not None:
-        np.random.seed(seed)
-
     tickers = df_portfolio.columns.tolist()
     n = len(tickers)
-    all_weights = np.zeros((num_portfolios, n))
-    ret_arr = np.zeros(num_portfolios)
-    vol_arr = np.zeros(num_portfolios)
-    sharpe_arr = np.zeros(num_portfolios)
-
-    for i in range(num_portfolios):
-        w = np.random.random(n)
-        w /= w.sum()
-        all_weights[i, :] = w
-        ret, vol = portfolio_performance_with_data(df_portfolio, list(w), period=period, annualization_factor=annualization_factor)
-        ret_arr[i] = ret
-        vol_arr[i] = vol
-        sharpe_arr[i] = (ret - risk_free_rate) / vol if vol != 0 else 0
-
-    # Optimal portfolios
-    max_sharpe_idx = sharpe_arr.argmax()
-    min_vol_idx = vol_arr.argmin()
+    expected_returns, covariance_matrix = portfolio_moments(
+        df_portfolio, annualization_factor=annualization_factor
+    )
+    samples = sample_frontier(
+        expected_returns,
+        covariance_matrix,
+        num_portfolios=num_portfolios,
+        seed=seed,
+        risk_free_rate=risk_free_rate,
+        sampling=sampling,
+        chunk_size=chunk_size,
+    )
 
-    max_sharpe = {
-        "tickers": tickers,
-        "weights": {
-            tickers[j]: float(all_weights[max_sharpe_idx, j]) for j in range(n)
-        },
-        "return": float(ret_arr[max_sharpe_idx]),
-        "volatility": float(vol_arr[max_sharpe_idx]),
-        "sharpe": float(sharpe_arr[max_sharpe_idx]),
-        "risk_free_rate": float(risk_free_rate),
-    }
+    def describe(candidate):
+        _, weights, portfolio_return, portfolio_volatility = candidate
+        return {
+            "tickers": tickers,
+            "weights": {tickers[j]: float(weights[j]) for j in range(n)},
+            "return": float(portfolio_return),
+            "volatility": float(portfolio_volatility),
+            "sharpe": float(
+                (portfolio_return - risk_free_rate) / portfolio_volatility
+                if portfolio_volatility != 0
+                else 0
+            ),
+            "risk_free_rate": float(risk_free_rate),
+        }
 
-    min_vol = {
-        "tickers": tickers,
-        "weights": {tickers[j]: float(all_weights[min_vol_idx, j]) for j in range(n)},
-        "return": float(ret_arr[min_vol_idx]),
-        "volatility": float(vol_arr[min_vol_idx]),
-        "sharpe": float(sharpe_arr[min_vol_idx]),
-        "risk_free_rate": float(risk_free_rate),
-    }
+    # Optimal portfolios
+    max_sharpe = describe(samples["max_sharpe"])
+    min_vol = describe(samples["min_vol"])
 
-    # Plotly figure for Efficient Frontier
+    # Plotly figure for Efficient Frontier: a fixed-size reservoir of the
+    # samples plus the efficient part of their upper hull.
+    reservoir = samples["reservoir"]
+    hull_vol, hull_ret, _ = samples["hull"]
+    efficient = slice(0, int(hull_ret.argmax()) + 1)
     fig = go.Figure()
     fig.add_trace(
-        go.Scatter(
-            x=vol_arr,
-            y=ret_arr,
+        scatter_trace_type(len(reservoir["vol"]))(
+            x=reservoir["vol"],
+            y=reservoir["ret"],
             mode="markers",
             name="Simulated Portfolios",
             marker=dict(
-                color=sharpe_arr,
+                color=reservoir["sharpe"],
                 colorscale="Viridis",
                 showscale=True,
                 size=6,
@@ -283,8 +2756,18 @@ def efficient_frontier_analysis_with_monte_carlo(
 
     fig.add_trace(
         go.Scatter(
-            x=[vol_arr[max_sharpe_idx]],
-            y=[ret_arr[max_sharpe_idx]],
+            x=hull_vol[efficient],
+            y=hull_ret[efficient],
+            mode="lines",
+            name="Sampled Frontier",
+            line=dict(color="royalblue", width=2),
+        )
+    )
+
+    fig.add_trace(
+        go.Scatter(
+            x=[max_sharpe["volatility"]],
+            y=[max_sharpe["return"]],
             mode="markers+text",
             name="Max Sharpe",
             marker=dict(color="red", size=10, symbol="star"),
@@ -295,8 +2778,8 @@ def efficient_frontier_analysis_with_monte_carlo(
 
     fig.add_trace(
         go.Scatter(
-            x=[vol_arr[min_vol_idx]],
-            y=[ret_arr[min_vol_idx]],
+            x=[min_vol["volatility"]],
+            y=[min_vol["return"]],
             mode="markers+text",
             name="Min Volatility",
             marker=dict(color="orange", size=10, symbol="diamond"),
@@ -316,6 +2799,329 @@ def efficient_frontier_analysis_with_monte_carlo(
     return fig, max_sharpe, min_vol
 
 
+class CriticalLineFrontier:
+    """
+    Exact efficient frontier of fully invested portfolios with per-asset
+    bounds (long-only by default), from Markowitz's critical line algorithm.
+
+    The frontier is piecewise linear in weights between turning points
+    where an asset enters or leaves its bounds. Each turning point is
+    reached from the previous one by updating the free set, so the walk is
+    warm-started, and each step only solves a system the size of the free
+    set. Candidate entries are scored for all bounded assets at once with a
+    bordered inverse. Any target return, the tangency portfolio and the
+    minimum-variance portfolio are then read off the segments exactly.
+    """
+
+    def __init__(self, expected_returns, covariance_matrix, lower_bounds=None, upper_bounds=None):
+        self.expected_returns = np.asarray(expected_returns, dtype=float)
+        self.covariance_matrix = np.asarray(covariance_matrix, dtype=float)
+        n = len(self.expected_returns)
+        self.lower_bounds = np.broadcast_to(
+            np.asarray(0.0 if lower_bounds is None else lower_bounds, dtype=float), (n,)
+        ).copy()
+        self.upper_bounds = np.broadcast_to(
+            np.asarray(1.0 if upper_bounds is None else upper_bounds, dtype=float), (n,)
+        ).copy()
+        if self.lower_bounds.sum() > 1 + 1e-12 or self.upper_bounds.sum() < 1 - 1e-12:
+            raise ValueError("Weight bounds do not admit a fully invested portfolio")
+        if (self.lower_bounds > self.upper_bounds).any():
+            raise ValueError("Lower bounds must not exceed upper bounds")
+        self.weights = self._solve()
+        self.returns = self.weights @ self.expected_returns
+        self.volatilities = np.sqrt(
+            np.maximum(
+                np.einsum("ij,ij->i", self.weights @ self.covariance_matrix, self.weights), 0.0
+            )
+        )
+
+    def _initial_portfolio(self):
+        """
+        Fill assets from the highest expected return up to their upper bound;
+        the asset that completes the budget is the first free one.
+        """
+        weights = self.lower_bounds.copy()
+        for asset in np.argsort(-self.expected_returns, kind="stable"):
+            weights[asset] = min(self.upper_bounds[asset], weights[asset] + 1 - weights.sum())
+            if weights.sum() >= 1 - 1e-12:
+                break
+        return [int(asset)], weights
+
+    def _solve(self):
+        mean = self.expected_returns
+        cov = self.covariance_matrix
+        n = len(mean)
+        free, weights = self._initial_portfolio()
+        turning_points = [weights.copy()]
+        current_lambda = None
+        # The asset that moved last may not reverse its move at the next
+        # step: that event's lambda equals the current one up to round-off.
+        last_asset, last_bound = None, None
+
+        for _ in range(4 * n + 10):
+            bounded = np.setdiff1d(np.arange(n), free)
+            inverse = np.linalg.inv(cov[np.ix_(free, free)])
+            inverse_ones = inverse.sum(axis=1)
+            inverse_mean = inverse @ mean[free]
+            c1 = inverse_ones.sum()
+            c3 = inverse_mean.sum()
+            cov_free_bounded = cov[np.ix_(free, bounded)]
+            bounded_weights = weights[bounded]
+            l1 = bounded_weights.sum()
+            l3 = inverse @ (cov_free_bounded @ bounded_weights)
+            l2 = l3.sum()
+
+            # Case a: a free asset hits one of its bounds.
+            lambda_in, asset_in, bound_in = -np.inf, None, None
+            if len(free) > 1:
+                c = -c1 * inverse_mean + c3 * inverse_ones
+                bounds = np.where(c > 0, self.upper_bounds[free], self.lower_bounds[free])
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    lambdas = ((1 - l1 + l2) * inverse_ones - c1 * (bounds + l3)) / c
+                lambdas[(c == 0) | np.isnan(lambdas)] = -np.inf
+                if current_lambda is not None:
+                    lambdas[lambdas > current_lambda] = -np.inf
+                lambdas[(np.asarray(free) == last_asset) & (bounds == last_bound)] = -np.inf
+                j = int(np.argmax(lambdas))
+                lambda_in, asset_in, bound_in = lambdas[j], free[j], bounds[j]
+
+            # Case b: a bounded asset becomes free, via the bordered inverse
+            # of the covariance over free + {asset}.
+            lambda_out, asset_out = -np.inf, None
+            if len(bounded):
+                inverse_cov = inverse @ cov_free_bounded
+                ones_term = inverse_cov.sum(axis=0) - 1
+                mean_term = cov_free_bounded.T @ inverse_mean
+                variances = cov[bounded, bounded]
+                schur = variances - np.einsum("ij,ij->j", cov_free_bounded, inverse_cov)
+                valid = schur > 1e-12 * np.maximum(variances, 1e-300)
+                schur = np.where(valid, schur, 1.0)
+                bounded_moves = cov[np.ix_(bounded, bounded)] @ bounded_weights
+                x_free = inverse_cov.T @ (cov_free_bounded @ bounded_weights) - (
+                    variances - schur
+                ) * bounded_weights
+                x_last = bounded_moves - variances * bounded_weights
+                new_c1 = c1 + ones_term**2 / schur
+                new_c3 = c3 + ones_term * (mean_term - mean[bounded]) / schur
+                c2_last = (mean[bounded] - mean_term) / schur
+                c4_last = -ones_term / schur
+                new_l1 = l1 - bounded_weights
+                new_l2 = (l2 - (ones_term + 1) * bounded_weights) + ones_term * (
+                    x_free - x_last
+                ) / schur
+                l3_last = (x_last - x_free) / schur
+                c = -new_c1 * c2_last + new_c3 * c4_last
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    lambdas = (
+                        (1 - new_l1 + new_l2) * c4_last - new_c1 * (bounded_weights + l3_last)
+                    ) / c
+                lambdas[~valid | (c == 0) | np.isnan(lambdas)] = -np.inf
+                if current_lambda is not None:
+                    lambdas[lambdas >= current_lambda] = -np.inf
+                lambdas[bounded == last_asset] = -np.inf
+                j = int(np.argmax(lambdas))
+                lambda_out, asset_out = lambdas[j], int(bounded[j])
+
+            if lambda_in < 0 and lambda_out < 0:
+                # No more events: the minimum-variance portfolio at lambda 0.
+                current_lambda, minimum_variance = 0.0, True
+            else:
+                minimum_variance = False
+                if lambda_in > lambda_out:
+                    current_lambda = lambda_in
+                    free.remove(asset_in)
+                    weights[asset_in] = bound_in
+                    last_asset, last_bound = asset_in, None
+                else:
+                    current_lambda = lambda_out
+                    free.append(asset_out)
+                    last_asset, last_bound = asset_out, weights[asset_out]
+
+            bounded = np.setdiff1d(np.arange(n), free)
+            inverse = np.linalg.inv(cov[np.ix_(free, free)])
+            inverse_ones = inverse.sum(axis=1)
+            inverse_mean = inverse @ mean[free]
+            l1 = weights[bounded].sum()
+            l3 = inverse @ (cov[np.ix_(free, bounded)] @ weights[bounded])
+            gamma = (-current_lambda * inverse_mean.sum() + 1 - l1 + l3.sum()) / inverse_ones.sum()
+            weights[free] = -l3 + gamma * inverse_ones + current_lambda * inverse_mean
+            turning_points.append(weights.copy())
+            if minimum_variance:
+                break
+
+        turning_points = np.array(turning_points)
+        # Drop points broken by round-off, then any point dominated by a
+        # later one with a higher return.
+        tolerance = 1e-9
+        feasible = (
+            (turning_points >= self.lower_bounds - tolerance).all(axis=1)
+            & (turning_points <= self.upper_bounds + tolerance).all(axis=1)
+            & (np.abs(turning_points.sum(axis=1) - 1) < tolerance)
+        )
+        turning_points = turning_points[feasible]
+        returns = turning_points @ mean
+        later_best = np.maximum.accumulate(returns[::-1])[::-1]
+        keep = returns >= np.append(later_best[1:], -np.inf) - 1e-15
+        return turning_points[keep]
+
+    def min_variance(self):
+        return self.weights[-1]
+
+    def portfolios(self, target_returns):
+        """
+        Frontier weights for each target return, clipped to the attainable
+        range, as a (K x N) matrix.
+        """
+        returns = self.returns[::-1]
+        weights = self.weights[::-1]
+        targets = np.clip(np.asarray(target_returns, dtype=float), returns[0], returns[-1])
+        if len(returns) == 1:
+            return np.repeat(weights[:1], len(targets), axis=0)
+        upper = np.clip(np.searchsorted(returns, targets), 1, len(returns) - 1)
+        lower = upper - 1
+        span = returns[upper] - returns[lower]
+        fraction = np.divide(
+            targets - returns[lower], span, out=np.zeros_like(targets), where=span > 0
+        )
+        return weights[lower] + fraction[:, None] * (weights[upper] - weights[lower])
+
+    def frontier(self, num_points=50):
+        """
+        Returns, volatilities and weights at num_points evenly spaced target
+        returns from the minimum-variance portfolio to the highest return.
+        """
+        weights = self.portfolios(
+            np.linspace(self.returns[-1], self.returns[0], num_points)
+        )
+        returns, volatilities = batch_portfolio_performance(
+            self.expected_returns, self.covariance_matrix, weights
+        )
+        return returns, volatilities, weights
+
+    def tangency(self, risk_free_rate=0.0):
+        """
+        Maximum-Sharpe portfolio: the Sharpe ratio along each segment has a
+        single closed-form stationary point, checked with the endpoints.
+        """
+        if len(self.weights) == 1:
+            return self.weights[0]
+        cov = self.covariance_matrix
+        start = self.weights[1:]
+        direction = self.weights[:-1] - start
+        p = start @ self.expected_returns - risk_free_rate
+        q = direction @ self.expected_returns
+        a = np.einsum("ij,ij->i", direction @ cov, direction)
+        b = np.einsum("ij,ij->i", start @ cov, direction)
+        c = np.einsum("ij,ij->i", start @ cov, start)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stationary = np.clip((p * b - q * c) / (q * b - p * a), 0.0, 1.0)
+        candidates = np.stack([np.zeros_like(p), np.ones_like(p), np.nan_to_num(stationary)])
+        variances = np.maximum(a * candidates**2 + 2 * b * candidates + c, 1e-300)
+        sharpe = (p + q * candidates) / np.sqrt(variances)
+        step, segment = np.unravel_index(np.argmax(sharpe), sharpe.shape)
+        return start[segment] + candidates[step, segment] * direction[segment]
+
+
+def efficient_frontier_exact(
+    df_portfolio,
+    num_points=50,
+    period="1y",
+    risk_free_rate: float = 0.0,
+    annualization_factor=252,
+    lower_bounds=None,
+    upper_bounds=None,
+):
+    """
+    Deterministic counterpart of efficient_frontier_analysis_with_monte_carlo:
+    the exact frontier from CriticalLineFrontier at num_points target
+    returns, with the tangency and minimum-variance portfolios solved
+    directly. Returns the same (fig, max_sharpe, min_vol) triple.
+    """
+    tickers = df_portfolio.columns.tolist()
+    expected_returns, covariance_matrix = portfolio_moments(
+        df_portfolio, annualization_factor=annualization_factor
+    )
+    frontier = CriticalLineFrontier(
+        expected_returns, covariance_matrix, lower_bounds, upper_bounds
+    )
+    returns, volatilities, _ = frontier.frontier(num_points)
+
+    def describe(weights):
+        portfolio_return, portfolio_volatility = batch_portfolio_performance(
+            expected_returns, covariance_matrix, weights[None, :]
+        )
+        portfolio_return = float(portfolio_return[0])
+        portfolio_volatility = float(portfolio_volatility[0])
+        return {
+            "tickers": tickers,
+            "weights": {
+                ticker: float(weight) for ticker, weight in zip(tickers, weights) if weight > 1e-10
+            },
+            "return": portfolio_return,
+            "volatility": portfolio_volatility,
+            "sharpe": (portfolio_return - risk_free_rate) / portfolio_volatility
+            if portfolio_volatility
+            else 0.0,
+            "risk_free_rate": float(risk_free_rate),
+        }
+
+    max_sharpe = describe(frontier.tangency(risk_free_rate))
+    min_vol = describe(frontier.min_variance())
+
+    asset_volatilities = np.sqrt(np.diag(covariance_matrix))
+    fig = go.Figure()
+    fig.add_trace(
+        scatter_trace_type(len(tickers))(
+            x=asset_volatilities,
+            y=expected_returns,
+            mode="markers",
+            name="Assets",
+            text=tickers,
+            marker=dict(color="lightgray", size=6),
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=volatilities,
+            y=returns,
+            mode="lines",
+            name="Efficient Frontier",
+            line=dict(color="royalblue", width=3),
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=[max_sharpe["volatility"]],
+            y=[max_sharpe["return"]],
+            mode="markers+text",
+            name="Max Sharpe",
+            marker=dict(color="red", size=10, symbol="star"),
+            text=["Max Sharpe"],
+            textposition="top center",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=[min_vol["volatility"]],
+            y=[min_vol["return"]],
+            mode="markers+text",
+            name="Min Volatility",
+            marker=dict(color="orange", size=10, symbol="diamond"),
+            text=["Min Vol"],
+            textposition="bottom center",
+        )
+    )
+    fig.update_layout(
+        title=f"Efficient Frontier (exact, {len(tickers)} assets, period={period}, rf={risk_free_rate:.2%})",
+        xaxis_title="Volatility (Std Dev)",
+        yaxis_title="Expected Return",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=600,
+    )
+
+    return fig, max_sharpe, min_vol
+
+
 def plot_correlation_heatmap(df):
     corr = df.corr()
     fig = go.Figure(
@@ -941,4 +3747,96 @@ popular_crypto_tickers = [
     "DCR-USD",      # Decred
     "PAXG-USD",    # PAX Gold
     
-]
\ No newline at end of file
+]
+
+
+class SecurityMaster:
+    """
+    Precomputed reference data for the ticker universe.
+
+    Attributes are compact arrays indexed by a symbol's position, which is
+    looked up in O(1); asset class, calendar and sector are stored as codes
+    into the matching tuple/list.
+    """
+
+    ASSET_CLASSES = ("equity", "crypto")
+    CALENDARS = ("NYSE", "24/7")
+
+    def __init__(self, symbols, sectors=None):
+        self.symbols = list(dict.fromkeys(symbols))
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+        is_crypto = np.fromiter(
+            (_is_crypto_symbol(s) for s in self.symbols), dtype=bool, count=len(self.symbols)
+        )
+        self.asset_class = is_crypto.astype(np.int8)
+        self.calendar = is_crypto.astype(np.int8)
+        self.annualization_factor = np.where(is_crypto, 365, 252).astype(np.int16)
+        self.sectors = ["Unclassified", "Digital Assets"]
+        self.sector = is_crypto.astype(np.int16)
+        if sectors:
+            self.set_sectors(sectors)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def position(self, symbol):
+        """
+        Index of symbol in the master arrays, or -1 if unknown.
+        """
+        return self._positions.get(symbol, -1)
+
+    def positions(self, symbols):
+        return np.fromiter(
+            (self._positions.get(s, -1) for s in symbols), dtype=np.intp, count=len(symbols)
+        )
+
+    def set_sectors(self, sectors):
+        """
+        Assign sectors from a {symbol: sector name} mapping.
+        """
+        for symbol, name in sectors.items():
+            position = self.position(symbol)
+            if position < 0:
+                continue
+            if name not in self.sectors:
+                self.sectors.append(name)
+            self.sector[position] = self.sectors.index(name)
+
+    def annualization_factors(self, symbols):
+        """
+        Per-asset annualization factors for a whole portfolio in one call.
+        """
+        symbols = list(symbols)
+        positions = self.positions(symbols)
+        factors = self.annualization_factor[np.maximum(positions, 0)].astype(float)
+        for i in np.flatnonzero(positions < 0):
+            factors[i] = 365 if _is_crypto_symbol(symbols[i]) else 252
+        return factors
+
+    def portfolio_annualization_factor(self, symbols):
+        """
+        Periods per year of a portfolio's "trading" returns panel: 252 if it
+        holds any exchange-traded asset, 365 for an all-crypto basket.
+        """
+        factors = self.annualization_factors(symbols)
+        return int(factors.min()) if len(factors) else 252
+
+    def describe(self, symbol):
+        position = self.position(symbol)
+        if position < 0:
+            raise KeyError(symbol)
+        return {
+            "symbol": symbol,
+            "asset_class": self.ASSET_CLASSES[self.asset_class[position]],
+            "annualization_factor": int(self.annualization_factor[position]),
+            "calendar": self.CALENDARS[self.calendar[position]],
+            "sector": self.sectors[self.sector[position]],
+        }
+
+
+security_master = SecurityMaster(snp500_tickers + popular_crypto_tickers)
+# Deduplicated selector options shared by every page.
+universe_tickers = security_master.symbols
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import matplotlib.pyplot as plt
+from scipy.stats import qmc
 from analysis_utils import (
     get_stock_data,
     add_indicators,
@@ -14,10 +15,16 @@ from analysis_utils import (
     parametric_var_portfolio,
     historical_var_portfolio,
     geometric_brownian_motion,
+    simulate_gbm_fan,
+    simulate_gbm_streaming,
+    simulate_multi_asset_gbm,
+    gbm_fan_chart,
     efficient_frontier_analysis_with_monte_carlo,
     plot_correlation_heatmap,
     snp500_tickers,
-    popular_crypto_tickers
+    popular_crypto_tickers,
+    security_master,
+    universe_tickers,
 )
 
 st.set_page_config(
@@ -31,7 +38,7 @@ st.header("Monte Carlo Geometric Brownian Motion Simulation")
 st.write("Simulate future stock prices using Geometric Brownian Motion.")
 tickers = st.multiselect(
     "Select Stocks for GBM Simulation",
-    snp500_tickers + popular_crypto_tickers,
+    universe_tickers,
     default=["AAPL", "MSFT", "GOOGL"],
 )
 weights_input = st.text_input(
@@ -43,11 +50,25 @@ start_value = st.number_input(
     "Starting Portfolio Value ($)", min_value=1000, max_value=10000000, value=100000
 )
 num_simulations = st.number_input(
-    "Number of Simulations", min_value=100, max_value=5000, value=500
+    "Number of Simulations", min_value=100, max_value=1_000_000, value=500
 )
 time_horizon = st.number_input(
     "Time Horizon (days)", min_value=1, max_value=365, value=252
 )
+model = st.radio(
+    "Simulation Model",
+    ["Portfolio series", "Per-asset (correlated)"],
+    horizontal=True,
+)
+rebalancing = st.selectbox(
+    "Rebalancing (per-asset model)",
+    ["Buy and hold", "Daily", "Monthly", "Quarterly"],
+)
+variance_reduction = st.selectbox(
+    "Variance Reduction",
+    ["None", "Antithetic variates", "Sobol QMC (Brownian bridge)"],
+)
+control_variate = st.checkbox("Control variate on the expected value", value=False)
 
 if st.button("Run Simulation"):
     tickers_list = list(tickers)
@@ -77,76 +98,64 @@ if st.button("Run Simulation"):
 
     portfolio_data = get_portfolio_history(tickers_list, period=period)
 
-    with st.spinner("Running Monte Carlo simulation..."):
-        paths = geometric_brownian_motion(
-            portfolio_data, weights, start_value, time_horizon, num_simulations
+    method = {
+        "None": "plain",
+        "Antithetic variates": "antithetic",
+        "Sobol QMC (Brownian bridge)": "sobol",
+    }[variance_reduction]
+    dimensions = time_horizon * (len(weights) if model == "Per-asset (correlated)" else 1)
+    if method == "sobol" and dimensions > qmc.Sobol.MAXDIM:
+        st.error(
+            f"Sobol QMC supports at most {qmc.Sobol.MAXDIM:,} dimensions "
+            f"(days × assets); this run needs {dimensions:,}. "
+            "Shorten the horizon, select fewer stocks or use antithetic variates."
         )
+        st.stop()
+    with st.spinner("Running Monte Carlo simulation..."):
+        if model == "Per-asset (correlated)":
+            summary = simulate_multi_asset_gbm(
+                portfolio_data,
+                weights,
+                start_value,
+                time_horizon,
+                num_simulations,
+                rebalance={"Buy and hold": None, "Daily": 1, "Monthly": 21, "Quarterly": 63}[
+                    rebalancing
+                ],
+                method=method,
+                control_variate=control_variate,
+                workers=2,
+            )
+        else:
+            summary = simulate_gbm_streaming(
+                portfolio_data,
+                weights,
+                start_value,
+                time_horizon,
+                num_simulations,
+                method=method,
+                control_variate=control_variate,
+            )
 
     st.success("Simulation complete!")
-    final_values = paths[:, -1]
     st.subheader("Simulation Results")
+    errors = summary["standard_errors"]
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric(
-            "5th Percentile (Worst Case)", f"${np.percentile(final_values, 5):,.0f}"
+            "5th Percentile (Worst Case)", f"${summary['quantiles'][5][-1]:,.0f}"
         )
+        st.caption(f"± ${errors[5][-1]:,.0f} standard error")
     with col2:
-        st.metric("Expected Value (Mean)", f"${final_values.mean():,.0f}")
+        st.metric("Expected Value (Mean)", f"${summary['mean'][-1]:,.0f}")
+        st.caption(f"± ${errors['mean'][-1]:,.0f} standard error")
     with col3:
         st.metric(
-            "95th Percentile (Best Case)", f"${np.percentile(final_values, 95):,.0f}"
+            "95th Percentile (Best Case)", f"${summary['quantiles'][95][-1]:,.0f}"
         )
+        st.caption(f"± ${errors[95][-1]:,.0f} standard error")
 
-    fig = go.Figure()
-
-    # 1. Spagetti Çizgileri (Performans için sadece ilk 50 tanesini çizelim)
-    # Hepsini çizersen tarayıcı donabilir.
-    for i in range(min(50, paths.shape[0])):
-        fig.add_trace(
-            go.Scatter(
-                y=paths[i, :],
-                mode="lines",
-                line=dict(color="rgba(50, 0, 220, 0.1)", width=1),
-                showlegend=False,
-            )
-        )
-
-    # 2. Ortalama ve Güven Aralıkları
-    mean_path = paths.mean(axis=0)
-    worst_case = np.percentile(paths, 5, axis=0)
-    best_case = np.percentile(paths, 95, axis=0)
-
-    fig.add_trace(
-        go.Scatter(
-            y=mean_path,
-            mode="lines",
-            name="Expected Value (Mean)",
-            line=dict(color="red", width=3),
-        )
-    )
-    fig.add_trace(
-        go.Scatter(
-            y=best_case,
-            mode="lines",
-            name="95th Percentile (Best Case)",
-            line=dict(color="green", dash="dash"),
-        )
-    )
-    fig.add_trace(
-        go.Scatter(
-            y=worst_case,
-            mode="lines",
-            name="5th Percentile (Worst Case)",
-            line=dict(color="orange", dash="dash"),
-        )
-    )
-
-    fig.update_layout(
-        title=f"GBM Simulation ({num_simulations} Scenarios)",
-        xaxis_title="Trading Day",
-        yaxis_title="Portfolio Value ($)",
-        hovermode="x",
-    )
+    fig = gbm_fan_chart(summary)
 
     st.plotly_chart(fig, use_container_width=True)
 
@@ -15,11 +15,19 @@ from analysis_utils import (
     calculate_historical_var,
     parametric_var_portfolio,
     historical_var_portfolio,
+    get_horizon_index,
+    backtest_var_portfolio,
+    MIN_BACKTEST_OBSERVATIONS,
+    monte_carlo_var_portfolio,
+    var_surface_portfolio,
+    var_attribution,
     geometric_brownian_motion,
     efficient_frontier_analysis_with_monte_carlo,
     plot_correlation_heatmap,
     snp500_tickers,
     popular_crypto_tickers,
+    security_master,
+    universe_tickers,
 )
 
 st.set_page_config(
@@ -32,7 +40,7 @@ st.set_page_config(
 st.header("Value at Risk (VaR) Analysis")
 st.write("Calculate the Value at Risk for your portfolio using different methods.")
 tickers = st.multiselect(
-    "Select Stocks for VaR Analysis", snp500_tickers + popular_crypto_tickers, default=["AAPL", "MSFT", "GOOGL"]
+    "Select Stocks for VaR Analysis", universe_tickers, default=["AAPL", "MSFT", "GOOGL"]
 )
 weights_input = st.text_input(
     "Enter corresponding weights (comma-separated)", "0.33, 0.33, 0.34"
@@ -47,6 +55,7 @@ portfolio_value = st.number_input(
 confidence_level = (
     st.slider("Confidence Level (%)", min_value=90, max_value=99, value=95) / 100
 )
+horizon = st.number_input("Time Horizon (days)", min_value=1, max_value=30, value=1)
 
 if st.button("Calculate VaR"):
     tickers_list = list(tickers)
@@ -74,24 +83,146 @@ if st.button("Calculate VaR"):
         weights = [w / weight_sum for w in weights]
 
     portfolio_data = get_portfolio_history(tickers_list, period=period)
+    # Cached per (tickers, period) and shared by every historical measure below.
+    horizon_index = get_horizon_index(tickers_list, period=period)
 
     parametric_var, port_vol = parametric_var_portfolio(
-        portfolio_data, weights, portfolio_value, confidence_level
+        portfolio_data,
+        weights,
+        portfolio_value,
+        confidence_level,
+        day=horizon,
+        annualization_factor=security_master.portfolio_annualization_factor(tickers_list),
     )
     historical_var = historical_var_portfolio(
-        portfolio_data, weights, portfolio_value, confidence_level
+        portfolio_data,
+        weights,
+        portfolio_value,
+        confidence_level,
+        day=horizon,
+        horizon_index=horizon_index,
     )
 
-    st.subheader("Value at Risk Results")
-    col1, col2, col3 = st.columns(3)
+    st.subheader(f"Value at Risk Results ({horizon}-day)")
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Parametric VaR", f"${parametric_var:,.2f}")
     with col2:
         st.metric("Historical VaR", f"${historical_var:,.2f}")
     with col3:
         st.metric("Portfolio Volatility", f"{port_vol:.2%}")
+    with col4:
+        st.metric("Max Drawdown", f"{horizon_index.max_drawdown(weights):.2%}")
 
-    portfolio_hist_ret = portfolio_data.dot(np.array(weights)).dropna()
+    with st.expander("Monte Carlo VaR (correlated assets, 200,000 scenarios)"):
+        monte_carlo = monte_carlo_var_portfolio(
+            portfolio_data,
+            weights,
+            portfolio_value,
+            confidence_levels=(confidence_level,),
+            day=horizon,
+            simulations=200_000,
+        )
+        mc_col1, mc_col2 = st.columns(2)
+        with mc_col1:
+            st.metric("Monte Carlo VaR", f"${monte_carlo['var'][confidence_level]:,.2f}")
+        with mc_col2:
+            st.metric("Monte Carlo ES", f"${monte_carlo['es'][confidence_level]:,.2f}")
+
+    with st.expander("VaR Surface (all confidence levels and horizons)"):
+        surface = var_surface_portfolio(
+            portfolio_data,
+            weights,
+            portfolio_value,
+            annualization_factor=security_master.portfolio_annualization_factor(tickers_list),
+            horizon_index=horizon_index,
+        )
+        surface.columns = [f"{day}-day" for day in surface.columns]
+        st.dataframe(surface.style.format("${:,.0f}"), use_container_width=True)
+
+    with st.expander("VaR Attribution (per position)"):
+        attribution = var_attribution(
+            portfolio_data,
+            weights,
+            portfolio_value,
+            confidence_level,
+            day=horizon,
+            annualization_factor=security_master.portfolio_annualization_factor(tickers_list),
+            horizon_index=horizon_index,
+        )
+        st.dataframe(
+            attribution.style.format(
+                {
+                    "Weight": "{:.2%}",
+                    "Component VaR %": "{:.2%}",
+                    "Marginal VaR": "${:,.0f}",
+                    "Component VaR": "${:,.0f}",
+                    "Incremental VaR": "${:,.0f}",
+                    "Historical Component VaR": "${:,.0f}",
+                    "Historical Component ES": "${:,.0f}",
+                }
+            ),
+            use_container_width=True,
+        )
+
+    with st.expander("VaR Backtest (rolling 250-day window, 1-day VaR)"):
+        backtest, coverage = backtest_var_portfolio(
+            portfolio_data, weights, portfolio_value, confidence_level, window=250
+        )
+        if backtest.empty:
+            st.info("Select a period longer than 1 year to backtest VaR.")
+        else:
+            exceptions = backtest[backtest["Exception"]]
+            backtest_fig = go.Figure()
+            backtest_fig.add_trace(
+                go.Scatter(
+                    x=backtest.index,
+                    y=backtest["Return"],
+                    mode="lines",
+                    name="Daily Return",
+                    line=dict(color="skyblue", width=1),
+                )
+            )
+            backtest_fig.add_trace(
+                go.Scatter(
+                    x=backtest.index,
+                    y=backtest["Threshold"],
+                    mode="lines",
+                    name=f"Historical VaR ({confidence_level:.0%})",
+                    line=dict(color="red"),
+                )
+            )
+            backtest_fig.add_trace(
+                go.Scatter(
+                    x=exceptions.index,
+                    y=exceptions["Return"],
+                    mode="markers",
+                    name="Exceptions",
+                    marker=dict(color="black", size=6),
+                )
+            )
+            backtest_fig.update_layout(
+                xaxis_title="Date", yaxis_title="Return", hovermode="x unified"
+            )
+            st.plotly_chart(backtest_fig, use_container_width=True)
+            st.write(
+                f"Exceptions: {coverage['exceptions']} observed vs "
+                f"{coverage['expected_exceptions']:.1f} expected "
+                f"({coverage['observations']} days)"
+            )
+            if coverage["observations"] < MIN_BACKTEST_OBSERVATIONS:
+                st.info(
+                    f"Coverage tests need at least {MIN_BACKTEST_OBSERVATIONS} "
+                    "out-of-sample days. Select a period of 2 years or longer."
+                )
+            else:
+                st.write(
+                    f"Kupiec p-value: {coverage['kupiec_pvalue']:.3f} · "
+                    f"Christoffersen p-value: {coverage['christoffersen_pvalue']:.3f} · "
+                    f"Conditional coverage p-value: {coverage['conditional_coverage_pvalue']:.3f}"
+                )
+
+    portfolio_hist_ret = horizon_index.horizon_returns(horizon, weights)
 
     # 2. %1'lik Sınırı Bul (Percentile)
     cutoff = np.percentile(portfolio_hist_ret, (1 - confidence_level) * 100)
@@ -105,7 +236,7 @@ if st.button("Calculate VaR"):
         bins=50,
         kde=True,
         color="skyblue",
-        label="Daily Returns Distribution",
+        label=f"{horizon}-day Returns Distribution",
     )
 
     # VaR Çizgisi (Kırmızı Çizgi)
@@ -119,7 +250,7 @@ if st.button("Calculate VaR"):
 
     # Süsleme
     plt.title("Historical Return Distribution and Risk Threshold", fontsize=14)
-    plt.xlabel("Daily Return")
+    plt.xlabel(f"{horizon}-day Return")
     plt.ylabel("Frequency (Number of Days)")
     plt.legend()
     plt.grid(True, alpha=0.3)
@@ -18,6 +18,8 @@ from analysis_utils import (
     plot_correlation_heatmap,
     snp500_tickers,
     popular_crypto_tickers,
+    security_master,
+    universe_tickers,
 )
 
 st.set_page_config(page_title="Correlation Heatmap", page_icon="📈")
@@ -26,7 +28,7 @@ st.header("Correlation Heatmap")
 st.write("Visualize the correlation between different stocks in your portfolio.")
 tickers = st.multiselect(
     "Select Stocks for Correlation Heatmap",
-    snp500_tickers + popular_crypto_tickers,
+    universe_tickers,
     default=["AAPL", "MSFT", "GOOGL"],
 )
 period = st.selectbox(
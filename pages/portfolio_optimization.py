@@ -15,9 +15,12 @@ from analysis_utils import (
     historical_var_portfolio,
     geometric_brownian_motion,
     efficient_frontier_analysis_with_monte_carlo,
+    efficient_frontier_exact,
     plot_correlation_heatmap,
     snp500_tickers,
-    popular_crypto_tickers
+    popular_crypto_tickers,
+    security_master,
+    universe_tickers,
 )
 
 st.set_page_config(
@@ -30,11 +33,25 @@ st.write(
 )
 tickers = st.multiselect(
     "Select Stocks for Portfolio Optimization",
-    snp500_tickers + popular_crypto_tickers,
+    universe_tickers,
     default=["AAPL", "MSFT", "GOOGL"],
 )
+method = st.radio(
+    "Optimization Method",
+    ["Exact (critical line)", "Monte Carlo sampling"],
+    horizontal=True,
+)
 num_portfolios = st.number_input(
-    "Number of Portfolios to Simulate", min_value=100, max_value=10000, value=1000
+    "Number of Portfolios to Simulate", min_value=100, max_value=50_000_000, value=1000
+)
+max_weight = (
+    st.number_input(
+        "Maximum Weight per Asset (%) (exact method)",
+        min_value=1.0,
+        max_value=100.0,
+        value=100.0,
+    )
+    / 100
 )
 risk_free_rate = (
     st.number_input("Risk-Free Rate (%)", min_value=0.0, max_value=10.0, value=2.0)
@@ -49,11 +66,28 @@ if st.button("Optimize Portfolio"):
         st.stop()
 
     stock_data = get_portfolio_history(tickers_list, period=period)
-    fig, max_sharpe_portfolio, min_vol_portfolio = (
-        efficient_frontier_analysis_with_monte_carlo(
-            stock_data, num_portfolios=num_portfolios, risk_free_rate=risk_free_rate
+    annualization_factor = security_master.portfolio_annualization_factor(tickers_list)
+    if method == "Exact (critical line)":
+        if max_weight * len(tickers_list) < 1:
+            st.error("Maximum weight is too low to invest the whole portfolio.")
+            st.stop()
+        fig, max_sharpe_portfolio, min_vol_portfolio = efficient_frontier_exact(
+            stock_data,
+            period=period,
+            risk_free_rate=risk_free_rate,
+            annualization_factor=annualization_factor,
+            upper_bounds=max_weight,
+        )
+    else:
+        fig, max_sharpe_portfolio, min_vol_portfolio = (
+            efficient_frontier_analysis_with_monte_carlo(
+                stock_data,
+                num_portfolios=num_portfolios,
+                period=period,
+                risk_free_rate=risk_free_rate,
+                annualization_factor=annualization_factor,
+            )
         )
-    )
     st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("Optimal Portfolios")
@@ -17,6 +17,8 @@ from analysis_utils import (
     plot_correlation_heatmap,
     snp500_tickers,
     popular_crypto_tickers,
+    security_master,
+    universe_tickers,
 )
 
 st.set_page_config(
@@ -31,7 +33,7 @@ st.write("Analyze the performance of your portfolio over time.")
 
 tickers = st.multiselect(
     "Select Stocks for Portfolio Analysis",
-    snp500_tickers + popular_crypto_tickers,
+    universe_tickers,
     default=["AAPL", "MSFT", "GOOGL"],
 )
 weights_input = st.text_input(
@@ -68,8 +70,9 @@ if st.button("Analyze Portfolio Performance"):
         weights = [w / weight_sum for w in weights]
 
     portfolio_data = get_portfolio_history(tickers_list, period=period)
+    annualization_factor = security_master.portfolio_annualization_factor(tickers_list)
     portfolio_return, portfolio_volatility = portfolio_performance_with_data(
-        portfolio_data, weights, period=period
+        portfolio_data, weights, period=period, annualization_factor=annualization_factor
     )
 
     st.subheader("Portfolio Performance Results")
@@ -18,6 +18,10 @@ from analysis_utils import (
     plot_correlation_heatmap,
     snp500_tickers,
     popular_crypto_tickers,
+    downsample_ohlc,
+    downsample_series,
+    security_master,
+    universe_tickers,
 )
 
 st.set_page_config(
@@ -31,7 +35,7 @@ st.header("Stock Price Analysis")
 st.write("Analyze historical stock prices and visualize key indicators.")
 
 ticker = st.selectbox(
-    "Select Stock Ticker", snp500_tickers + popular_crypto_tickers, index=snp500_tickers.index("AAPL")
+    "Select Stock Ticker", universe_tickers, index=security_master.position("AAPL")
 )
 period = st.selectbox(
     "Select Period", ["1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "max"], index=5
@@ -48,45 +52,34 @@ if st.button("Get Stock Data"):
         st.dataframe(df.tail())
 
         df_indicators = add_indicators(df)
+        candles = downsample_ohlc(df)
 
         fig = go.Figure()
         fig.add_trace(
             go.Candlestick(
-                x=df_indicators.index,
-                open=df_indicators["Open"],
-                high=df_indicators["High"],
-                low=df_indicators["Low"],
-                close=df_indicators["Close"],
+                x=candles.index,
+                open=candles["Open"],
+                high=candles["High"],
+                low=candles["Low"],
+                close=candles["Close"],
                 name="OHLC",
             )
         )
-        fig.add_trace(
-            go.Scatter(
-                x=df_indicators.index,
-                y=df_indicators["SMA_20"],
-                mode="lines",
-                name="20-day SMA",
-                line=dict(color="orange"),
-            )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df_indicators.index,
-                y=df_indicators["SMA_50"],
-                mode="lines",
-                name="50-day SMA",
-                line=dict(color="blue"),
+        for column, label, color in [
+            ("SMA_20", "20-day SMA", "orange"),
+            ("SMA_50", "50-day SMA", "blue"),
+            ("SMA_200", "200-day SMA", "red"),
+        ]:
+            sma = downsample_series(df_indicators[column])
+            fig.add_trace(
+                go.Scatter(
+                    x=sma.index,
+                    y=sma.to_numpy(),
+                    mode="lines",
+                    name=label,
+                    line=dict(color=color),
+                )
             )
-        )
-        fig.add_trace(
-            go.Scatter(
-                x=df_indicators.index,
-                y=df_indicators["SMA_200"],
-                mode="lines",
-                name="200-day SMA",
-                line=dict(color="red"),
-            )
-        )
 
         fig.update_layout(
             title=f"{ticker} Chart with Moving Averages",
@@ -97,5 +90,5 @@ if st.button("Get Stock Data"):
         st.plotly_chart(fig)
 
         st.subheader("Volatility Analysis")
-        vol_fig = volatility_analysis(df)
+        vol_fig = volatility_analysis(df, ticker=ticker)
         st.plotly_chart(vol_fig)
@@ -1,3 +1,5 @@
+import os
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -14,6 +16,9 @@ from analysis_utils import (
     historical_var_portfolio,
     geometric_brownian_motion,
     efficient_frontier_analysis_with_monte_carlo,
+    start_universe_warm_up,
+    snp500_tickers,
+    popular_crypto_tickers,
 )
 
 st.set_page_config(
@@ -51,6 +56,36 @@ stock_page = st.Page(
     "pages/stock_page.py", title="Stock Price Analysis", icon=":material/price_change:"
 )
 
+
+@st.cache_resource
+def universe_warm_up():
+    # One background warm-up per server process, shared by every session.
+    return start_universe_warm_up(snp500_tickers + popular_crypto_tickers)
+
+
+# Optional: prefetch the whole ticker universe when the app starts.
+if os.environ.get("ALGO_RISK_WARMUP", "0") == "1":
+    warm_up = universe_warm_up()
+
+    # Re-run only this fragment every few seconds while the job is running,
+    # so the sidebar tracks it without the user interacting with the page.
+    @st.fragment(run_every=None if warm_up.finished else 2)
+    def warm_up_progress():
+        if warm_up.finished:
+            st.caption(
+                f"Market data cache warm: {warm_up.done - len(warm_up.failed)}"
+                f"/{warm_up.total} tickers"
+            )
+        else:
+            st.progress(
+                warm_up.progress,
+                text=f"Warming market data cache: {warm_up.done}/{warm_up.total}",
+            )
+
+    with st.sidebar:
+        warm_up_progress()
+
+
 pg = st.navigation(
     [
         home,